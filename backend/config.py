@@ -1,6 +1,6 @@
 """Application configuration using pydantic-settings."""
 
-from functools import lru_cache
+from functools import cached_property, lru_cache
 from pydantic_settings import BaseSettings
 from typing import List
 
@@ -20,13 +20,20 @@ class Settings(BaseSettings):
 
     # Rate limiting
     rate_limit: int = 10
+    rate_limit_storage_uri: str = "memory://"
 
     # Vector database
     chroma_db_path: str = "./chroma_db"
+    chroma_server_url: str = ""
     collection_name: str = "portfolio_docs"
+    hnsw_construction_ef: int = 100
+    hnsw_m: int = 16
 
     # Embedding model
     embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2"
+    embedding_onnx_int8: bool = False
+    onnx_model_dir: str = "./onnx_models"
+    embedding_cache_path: str = "./embedding_cache.db"
 
     # LLM
     llm_model: str = "gpt-4o-mini"
@@ -36,9 +43,9 @@ class Settings(BaseSettings):
     chunk_overlap: int = 90
     retrieval_k: int = 5
 
-    @property
+    @cached_property
     def origins_list(self) -> List[str]:
-        """Parse allowed origins into a list."""
+        """Parse allowed origins into a list (once per settings instance)."""
         return [origin.strip() for origin in self.allowed_origins.split(",")]
 
     @property
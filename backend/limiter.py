@@ -0,0 +1,13 @@
+"""Shared rate limiter instance for the API."""
+
+from slowapi import Limiter
+from slowapi.util import get_remote_address
+
+from config import get_settings
+
+
+# Single limiter so route decorators and app.state share one set of buckets
+limiter = Limiter(
+    key_func=get_remote_address,
+    storage_uri=get_settings().rate_limit_storage_uri
+)
@@ -9,28 +9,29 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
+from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 
 from config import get_settings
+from limiter import limiter
 from routers import rag
 from services.vector_db import VectorDBService
 from services.embedding_service import EmbeddingService
+from services.llm_service import LLMService
+from services.rag_service import RAGService
 
 
-# Initialize rate limiter
-limiter = Limiter(key_func=get_remote_address)
-
 # Services (initialized on startup)
 vector_db: VectorDBService = None
 embedding_service: EmbeddingService = None
+llm_service: LLMService = None
+rag_service: RAGService = None
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan events - startup and shutdown."""
-    global vector_db, embedding_service
+    global vector_db, embedding_service, llm_service, rag_service
 
     settings = get_settings()
 
@@ -41,9 +42,22 @@ async def lifespan(app: FastAPI):
     print(f"Initializing vector database at: {settings.chroma_db_path}")
     vector_db = VectorDBService(settings, embedding_service)
 
+    # LLM clients hold connection pools, so build them once and share
+    print(f"Initializing LLM service with model: {settings.llm_model}")
+    llm_service = LLMService(settings)
+    rag_service = RAGService(settings, vector_db, llm_service)
+
+    # Warm up the embedding model and HNSW index so the first request isn't cold
+    try:
+        vector_db.query("warmup", n_results=1)
+    except Exception as e:
+        print(f"Warmup query skipped: {e}")
+
     # Store in app state for access in routes
     app.state.vector_db = vector_db
     app.state.embedding_service = embedding_service
+    app.state.llm_service = llm_service
+    app.state.rag_service = rag_service
     app.state.settings = settings
 
     print("RAG backend started successfully!")
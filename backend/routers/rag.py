@@ -4,18 +4,19 @@ from typing import List, Dict, Any, Optional
 from fastapi import APIRouter, Request, HTTPException, Depends
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from slowapi import Limiter
-from slowapi.util import get_remote_address
-import json
+import asyncio
+import orjson
 
 from config import get_settings, Settings
+from limiter import limiter
 from services.vector_db import VectorDBService
-from services.llm_service import LLMService
 from services.rag_service import RAGService
 
 
 router = APIRouter()
-limiter = Limiter(key_func=get_remote_address)
+
+# Only the last 3 exchanges are sent to the LLM
+MAX_HISTORY_MESSAGES = 6
 
 
 # Request/Response models
@@ -49,13 +50,24 @@ class CollectionInfoResponse(BaseModel):
     path: str
 
 
+_SSE_PREFIX = b"data: "
+_SSE_SUFFIX = b"\n\n"
+
+
+def _sse(event: Dict[str, Any]) -> bytes:
+    """Encode an event as a Server-Sent Events frame."""
+    return _SSE_PREFIX + orjson.dumps(event) + _SSE_SUFFIX
+
+
+# Frames that never change are encoded once at import
+_SSE_SEARCHING = _sse({"type": "status", "data": "searching"})
+_SSE_DONE = _sse({"type": "done"})
+
+
 # Dependency to get RAG service
 def get_rag_service(request: Request) -> RAGService:
     """Get RAG service from app state."""
-    settings = request.app.state.settings
-    vector_db = request.app.state.vector_db
-    llm_service = LLMService(settings)
-    return RAGService(settings, vector_db, llm_service)
+    return request.app.state.rag_service
 
 
 def get_vector_db(request: Request) -> VectorDBService:
@@ -79,9 +91,12 @@ async def ask_question(
         # Convert chat history to list of dicts if provided
         chat_history = None
         if body.chat_history:
-            chat_history = [msg.model_dump() for msg in body.chat_history]
+            chat_history = [
+                {"role": msg.role, "content": msg.content}
+                for msg in body.chat_history[-MAX_HISTORY_MESSAGES:]
+            ]
 
-        result = rag_service.query(
+        result = await rag_service.query(
             question=body.question,
             chat_history=chat_history
         )
@@ -108,27 +123,36 @@ async def ask_question_stream(
     Rate limited to 10 requests per minute per IP.
     """
     async def generate():
+        # Send a first frame right away so the client sees progress before retrieval
+        yield _SSE_SEARCHING
+        await asyncio.sleep(0)
+
         try:
             # Convert chat history
             chat_history = None
             if body.chat_history:
-                chat_history = [msg.model_dump() for msg in body.chat_history]
+                chat_history = [
+                    {"role": msg.role, "content": msg.content}
+                    for msg in body.chat_history[-MAX_HISTORY_MESSAGES:]
+                ]
 
-            # Get sources first
-            sources = rag_service.get_sources(body.question)
-            yield f"data: {json.dumps({'type': 'sources', 'data': sources})}\n\n"
+            # Retrieve once and reuse the results for sources and generation
+            results = await asyncio.to_thread(rag_service.retrieve, body.question)
+            sources = rag_service.format_sources(results)
+            yield _sse({'type': 'sources', 'data': sources})
 
             # Stream response
             async for chunk in rag_service.query_stream(
                 question=body.question,
-                chat_history=chat_history
+                chat_history=chat_history,
+                retrieval_results=results
             ):
-                yield f"data: {json.dumps({'type': 'chunk', 'data': chunk})}\n\n"
+                yield _sse({'type': 'chunk', 'data': chunk})
 
-            yield f"data: {json.dumps({'type': 'done'})}\n\n"
+            yield _SSE_DONE
 
         except Exception as e:
-            yield f"data: {json.dumps({'type': 'error', 'data': str(e)})}\n\n"
+            yield _sse({'type': 'error', 'data': str(e)})
 
     return StreamingResponse(
         generate(),
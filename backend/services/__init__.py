@@ -1,8 +1,9 @@
 """Services package for RAG backend."""
 
+from .embedding_cache import EmbeddingCache
 from .embedding_service import EmbeddingService
 from .vector_db import VectorDBService
 from .llm_service import LLMService
 from .rag_service import RAGService
 
-__all__ = ["EmbeddingService", "VectorDBService", "LLMService", "RAGService"]
+__all__ = ["EmbeddingCache", "EmbeddingService", "VectorDBService", "LLMService", "RAGService"]
@@ -1,9 +1,23 @@
 """Embedding service for generating text embeddings."""
 
+import threading
+from collections import OrderedDict
+from pathlib import Path
 from typing import List, Optional
 import numpy as np
 
 from config import Settings
+from services.embedding_cache import EmbeddingCache
+
+
+# Maximum number of query embeddings kept in the LRU cache
+QUERY_CACHE_SIZE = 512
+
+# Batch size for local document embedding
+EMBED_BATCH_SIZE = 64
+
+# Batch size for bulk ingestion via encode_batch
+BULK_EMBED_BATCH_SIZE = 256
 
 
 class EmbeddingService:
@@ -12,17 +26,35 @@ class EmbeddingService:
     def __init__(self, settings: Settings):
         self.settings = settings
         self.model = None
+        self.onnx_model = None
+        self._query_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._query_cache_lock = threading.Lock()
         self._initialize_model()
 
+        # Quantized vectors differ from full-precision ones, so cache them separately
+        self.embedding_cache: Optional[EmbeddingCache] = None
+        if self.settings.embedding_cache_path:
+            cache_model = self.settings.embedding_model
+            if self.onnx_model is not None:
+                cache_model += ":onnx-int8"
+            self.embedding_cache = EmbeddingCache(self.settings.embedding_cache_path, cache_model)
+
     def _initialize_model(self):
         """Initialize the embedding model based on configuration."""
         if self.settings.is_local_embedding:
             # Use sentence-transformers for local embeddings
             from sentence_transformers import SentenceTransformer
 
+            if self.settings.embedding_onnx_int8 and self._initialize_onnx_model():
+                return
+
             model_name = self.settings.embedding_model.replace("sentence-transformers/", "")
-            print(f"Loading local embedding model: {model_name}")
-            self.model = SentenceTransformer(model_name)
+            device = self._select_device()
+            print(f"Loading local embedding model: {model_name} on {device}")
+            self.model = SentenceTransformer(model_name, device=device)
+            if device == "cuda":
+                # Half precision doubles tensor-core throughput with negligible recall loss
+                self.model.half()
             self.dimensions = self.model.get_sentence_embedding_dimension()
             print(f"Model loaded with {self.dimensions} dimensions")
         else:
@@ -33,6 +65,60 @@ class EmbeddingService:
             # text-embedding-3-small has 1536 dimensions
             self.dimensions = 1536 if "small" in self.settings.embedding_model else 3072
 
+    @staticmethod
+    def _select_device() -> str:
+        """Pick the fastest available torch device for local embeddings."""
+        import torch
+
+        if torch.cuda.is_available():
+            return "cuda"
+        if torch.backends.mps.is_available():
+            return "mps"
+        return "cpu"
+
+    def _initialize_onnx_model(self) -> bool:
+        """
+        Load an int8-quantized ONNX export of the local model.
+
+        Returns:
+            True if the ONNX model was loaded, False to fall back to sentence-transformers
+        """
+        try:
+            from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+            from optimum.onnxruntime.configuration import AutoQuantizationConfig
+            from transformers import AutoTokenizer
+        except ImportError:
+            print("optimum[onnxruntime] not installed, falling back to sentence-transformers")
+            return False
+
+        model_id = self.settings.embedding_model
+        save_dir = Path(self.settings.onnx_model_dir) / model_id.replace("/", "__")
+        quantized_file = "model_quantized.onnx"
+
+        if not (save_dir / quantized_file).exists():
+            print(f"Exporting and quantizing {model_id} to {save_dir}")
+            exported = ORTModelForFeatureExtraction.from_pretrained(model_id, export=True)
+            quantizer = ORTQuantizer.from_pretrained(exported)
+            quantizer.quantize(
+                save_dir=save_dir,
+                quantization_config=AutoQuantizationConfig.avx512_vnni(
+                    is_static=False,
+                    per_channel=False
+                )
+            )
+            AutoTokenizer.from_pretrained(model_id).save_pretrained(save_dir)
+
+        print(f"Loading int8 ONNX embedding model from: {save_dir}")
+        self.onnx_model = ORTModelForFeatureExtraction.from_pretrained(
+            save_dir,
+            file_name=quantized_file,
+            provider="CPUExecutionProvider"
+        )
+        self.tokenizer = AutoTokenizer.from_pretrained(save_dir)
+        self.dimensions = self.onnx_model.config.hidden_size
+        print(f"Model loaded with {self.dimensions} dimensions")
+        return True
+
     def embed(self, texts: List[str]) -> List[List[float]]:
         """
         Generate embeddings for a list of texts.
@@ -51,15 +137,105 @@ class EmbeddingService:
         else:
             return self._embed_openai(texts)
 
+    def encode_batch(
+        self,
+        texts: List[str],
+        batch_size: int = BULK_EMBED_BATCH_SIZE
+    ) -> np.ndarray:
+        """
+        Generate embeddings for a large list of texts, for bulk ingestion.
+
+        Args:
+            texts: List of text strings to embed
+            batch_size: Number of texts per model forward pass / API request
+
+        Returns:
+            float32 array of shape (len(texts), dimensions)
+        """
+        if not texts:
+            return np.empty((0, self.dimensions), dtype=np.float32)
+
+        if self.embedding_cache is None:
+            return self._encode_batch_uncached(texts, batch_size)
+
+        # Only embed chunks whose content hasn't been embedded before
+        hashes = [EmbeddingCache.hash_text(text) for text in texts]
+        cached = self.embedding_cache.get_many(hashes)
+
+        embeddings = np.empty((len(texts), self.dimensions), dtype=np.float32)
+        missing = []
+        for i, key in enumerate(hashes):
+            vector = cached.get(key)
+            if vector is None:
+                missing.append(i)
+            else:
+                embeddings[i] = vector
+
+        if missing:
+            computed = self._encode_batch_uncached([texts[i] for i in missing], batch_size)
+            embeddings[missing] = computed
+            self.embedding_cache.put_many([hashes[i] for i in missing], computed)
+
+        return embeddings
+
+    def _encode_batch_uncached(self, texts: List[str], batch_size: int) -> np.ndarray:
+        """Embed texts in batches without consulting the cache."""
+        if self.settings.is_local_embedding:
+            return self._embed_local_np(texts, batch_size=batch_size)
+
+        embeddings = np.empty((len(texts), self.dimensions), dtype=np.float32)
+        for start in range(0, len(texts), batch_size):
+            batch = self._embed_openai(texts[start:start + batch_size])
+            embeddings[start:start + len(batch)] = batch
+        return embeddings
+
     def _embed_local(self, texts: List[str]) -> List[List[float]]:
         """Generate embeddings using local sentence-transformers model."""
+        return self._embed_local_np(texts).tolist()
+
+    def _embed_local_np(
+        self,
+        texts: List[str],
+        batch_size: int = EMBED_BATCH_SIZE
+    ) -> np.ndarray:
+        """Generate embeddings as a float32 array using the local model."""
+        if self.onnx_model is not None:
+            return self._embed_onnx(texts, batch_size=batch_size)
+
         embeddings = self.model.encode(
             texts,
+            batch_size=batch_size,
             convert_to_numpy=True,
             normalize_embeddings=True,
             show_progress_bar=len(texts) > 10
         )
-        return embeddings.tolist()
+        return np.asarray(embeddings, dtype=np.float32)
+
+    def _embed_onnx(self, texts: List[str], batch_size: int = EMBED_BATCH_SIZE) -> np.ndarray:
+        """Generate normalized embeddings with the quantized ONNX model."""
+        embeddings = np.empty((len(texts), self.dimensions), dtype=np.float32)
+
+        # Batch texts of similar length together so each batch pads to a short max
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        for start in range(0, len(order), batch_size):
+            batch_idx = order[start:start + batch_size]
+            # One fast-tokenizer call per batch (Rust-side, parallel across texts)
+            inputs = self.tokenizer(
+                [texts[i] for i in batch_idx],
+                padding=True,
+                truncation=True,
+                return_tensors="np"
+            )
+            outputs = self.onnx_model(**inputs)
+            token_embeddings = np.asarray(outputs.last_hidden_state, dtype=np.float32)
+
+            # Mean pooling over non-padding tokens, as sentence-transformers does
+            mask = inputs["attention_mask"][..., None].astype(np.float32)
+            summed = (token_embeddings * mask).sum(axis=1)
+            embeddings[batch_idx] = summed / np.clip(mask.sum(axis=1), 1e-9, None)
+
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.clip(norms, 1e-12, None)
 
     def _embed_openai(self, texts: List[str]) -> List[List[float]]:
         """Generate embeddings using OpenAI API."""
@@ -79,8 +255,43 @@ class EmbeddingService:
         Returns:
             Embedding vector
         """
-        embeddings = self.embed([query])
-        return embeddings[0] if embeddings else []
+        return self.embed_query_np(query).tolist()
+
+    def embed_query_np(self, query: str) -> np.ndarray:
+        """
+        Generate embedding for a single query as a float32 array.
+
+        Chroma accepts numpy arrays directly, so the query path can skip
+        the list conversion.
+
+        Args:
+            query: Query text to embed
+
+        Returns:
+            Read-only embedding vector (shared with the query cache)
+        """
+        # Normalize only the cache key; the original text is what gets embedded
+        key = query.strip().lower()
+
+        # Repeat questions are common, so serve them from the LRU cache
+        with self._query_cache_lock:
+            cached = self._query_cache.get(key)
+            if cached is not None:
+                self._query_cache.move_to_end(key)
+                return cached
+
+        if self.settings.is_local_embedding:
+            embedding = self._embed_local_np([query])[0]
+        else:
+            embedding = np.asarray(self._embed_openai([query])[0], dtype=np.float32)
+        embedding.setflags(write=False)
+
+        with self._query_cache_lock:
+            self._query_cache[key] = embedding
+            if len(self._query_cache) > QUERY_CACHE_SIZE:
+                self._query_cache.popitem(last=False)
+
+        return embedding
 
     def get_dimensions(self) -> int:
         """Get the dimensionality of embeddings."""
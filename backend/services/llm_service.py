@@ -1,7 +1,7 @@
 """LLM service for generating responses using OpenAI."""
 
 from typing import AsyncGenerator, List, Dict, Any
-from openai import OpenAI, AsyncOpenAI
+from openai import AsyncOpenAI
 
 from config import Settings
 
@@ -29,10 +29,9 @@ class LLMService:
 
     def __init__(self, settings: Settings):
         self.settings = settings
-        self.client = OpenAI(api_key=settings.openai_api_key)
         self.async_client = AsyncOpenAI(api_key=settings.openai_api_key)
 
-    def generate_response(
+    async def generate_response(
         self,
         question: str,
         context: str,
@@ -51,7 +50,7 @@ class LLMService:
         """
         messages = self._build_messages(question, context, chat_history)
 
-        response = self.client.chat.completions.create(
+        response = await self.async_client.chat.completions.create(
             model=self.settings.llm_model,
             messages=messages,
             temperature=0.7,
@@ -105,13 +104,9 @@ class LLMService:
             }
         ]
 
-        # Add chat history if provided
+        # Add chat history if provided (already truncated and shaped by the router)
         if chat_history:
-            for msg in chat_history[-6:]:  # Keep last 3 exchanges
-                messages.append({
-                    "role": msg.get("role", "user"),
-                    "content": msg.get("content", "")
-                })
+            messages.extend(chat_history)
 
         # Add current question
         messages.append({
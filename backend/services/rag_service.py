@@ -1,12 +1,22 @@
 """RAG service combining retrieval and generation."""
 
+import asyncio
+import hashlib
+import threading
 from typing import AsyncGenerator, List, Dict, Any, Optional
 
+from cachetools import TTLCache
+
 from config import Settings
 from services.vector_db import VectorDBService
 from services.llm_service import LLMService
 
 
+# Retrieval results cache bounds
+RETRIEVAL_CACHE_SIZE = 256
+RETRIEVAL_CACHE_TTL = 300
+
+
 class RAGService:
     """Service implementing the RAG pipeline."""
 
@@ -19,11 +29,17 @@ class RAGService:
         self.settings = settings
         self.vector_db = vector_db
         self.llm_service = llm_service
+        self._retrieval_cache: TTLCache = TTLCache(
+            maxsize=RETRIEVAL_CACHE_SIZE,
+            ttl=RETRIEVAL_CACHE_TTL
+        )
+        self._retrieval_cache_lock = threading.Lock()
 
-    def query(
+    async def query(
         self,
         question: str,
-        chat_history: Optional[List[Dict[str, str]]] = None
+        chat_history: Optional[List[Dict[str, str]]] = None,
+        retrieval_results: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """
         Process a question using RAG.
@@ -31,21 +47,20 @@ class RAGService:
         Args:
             question: User's question
             chat_history: Optional conversation history
+            retrieval_results: Optional results from retrieve(), to avoid searching twice
 
         Returns:
             Dict with response and retrieved sources
         """
-        # Retrieve relevant documents
-        retrieval_results = self.vector_db.query(
-            query_text=question,
-            n_results=self.settings.retrieval_k
-        )
+        # Retrieve relevant documents off the event loop (embedding + ANN search block)
+        if retrieval_results is None:
+            retrieval_results = await asyncio.to_thread(self.retrieve, question)
 
         # Format context from retrieved documents
         context = self._format_context(retrieval_results)
 
         # Generate response
-        response = self.llm_service.generate_response(
+        response = await self.llm_service.generate_response(
             question=question,
             context=context,
             chat_history=chat_history
@@ -53,13 +68,14 @@ class RAGService:
 
         return {
             "response": response,
-            "sources": self._format_sources(retrieval_results)
+            "sources": self.format_sources(retrieval_results)
         }
 
     async def query_stream(
         self,
         question: str,
-        chat_history: Optional[List[Dict[str, str]]] = None
+        chat_history: Optional[List[Dict[str, str]]] = None,
+        retrieval_results: Optional[Dict[str, Any]] = None
     ) -> AsyncGenerator[str, None]:
         """
         Process a question using RAG with streaming response.
@@ -67,15 +83,14 @@ class RAGService:
         Args:
             question: User's question
             chat_history: Optional conversation history
+            retrieval_results: Optional results from retrieve(), to avoid searching twice
 
         Yields:
             Chunks of the generated response
         """
-        # Retrieve relevant documents
-        retrieval_results = self.vector_db.query(
-            query_text=question,
-            n_results=self.settings.retrieval_k
-        )
+        # Retrieve relevant documents off the event loop (embedding + ANN search block)
+        if retrieval_results is None:
+            retrieval_results = await asyncio.to_thread(self.retrieve, question)
 
         # Format context from retrieved documents
         context = self._format_context(retrieval_results)
@@ -88,6 +103,36 @@ class RAGService:
         ):
             yield chunk
 
+    def retrieve(self, question: str) -> Dict[str, Any]:
+        """
+        Run retrieval for a question.
+
+        Args:
+            question: User's question
+
+        Returns:
+            Dict containing ids, documents, metadatas, and distances
+        """
+        digest = hashlib.blake2b(
+            question.strip().lower().encode("utf-8"),
+            digest_size=16
+        ).digest()
+        # The collection version invalidates entries whenever documents change
+        key = (self.vector_db.version, digest, self.settings.retrieval_k)
+
+        with self._retrieval_cache_lock:
+            cached = self._retrieval_cache.get(key)
+        if cached is None:
+            cached = self.vector_db.query(
+                query_text=question,
+                n_results=self.settings.retrieval_k
+            )
+            with self._retrieval_cache_lock:
+                self._retrieval_cache[key] = cached
+
+        # Hand out copies so callers can't mutate the cached lists
+        return {field: list(values) for field, values in cached.items()}
+
     def get_sources(self, question: str) -> List[Dict[str, Any]]:
         """
         Get the sources that would be retrieved for a question.
@@ -98,11 +143,7 @@ class RAGService:
         Returns:
             List of source documents with metadata
         """
-        retrieval_results = self.vector_db.query(
-            query_text=question,
-            n_results=self.settings.retrieval_k
-        )
-        return self._format_sources(retrieval_results)
+        return self.format_sources(self.retrieve(question))
 
     def _format_context(self, retrieval_results: Dict[str, Any]) -> str:
         """Format retrieved documents into a context string."""
@@ -116,18 +157,17 @@ class RAGService:
 
         return "\n\n---\n\n".join(context_parts)
 
-    def _format_sources(self, retrieval_results: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def format_sources(self, retrieval_results: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Format retrieval results into source list."""
-        sources = []
-        documents = retrieval_results.get("documents", [])
-        metadatas = retrieval_results.get("metadatas", [])
-        distances = retrieval_results.get("distances", [])
-
-        for doc, meta, dist in zip(documents, metadatas, distances):
-            sources.append({
+        return [
+            {
                 "content": doc[:200] + "..." if len(doc) > 200 else doc,
                 "metadata": meta or {},
                 "similarity": round(1 - dist, 3)  # Convert distance to similarity
-            })
-
-        return sources
+            }
+            for doc, meta, dist in zip(
+                retrieval_results.get("documents", []),
+                retrieval_results.get("metadatas", []),
+                retrieval_results.get("distances", [])
+            )
+        ]
@@ -1,37 +1,78 @@
 """Vector database service using ChromaDB."""
 
-from typing import List, Dict, Any, Optional
+import time
+from urllib.parse import urlparse
+from typing import List, Dict, Any, Optional, Set, Tuple, Union
 import chromadb
+import numpy as np
 from chromadb.config import Settings as ChromaSettings
 
 from config import Settings
 from services.embedding_service import EmbeddingService
 
 
+# Seconds a cached collection count stays valid
+COUNT_CACHE_TTL = 5.0
+
+# SQLite settings for bulk loads: no rollback journal, no fsync, one writer.
+# A crash mid-load can corrupt the store, so only use for re-runnable ingests.
+BULK_LOAD_PRAGMAS = {
+    "journal_mode": "OFF",
+    "synchronous": "OFF",
+    "locking_mode": "EXCLUSIVE",
+    "temp_store": "MEMORY",
+}
+
+
 class VectorDBService:
     """Service for vector storage and retrieval using ChromaDB."""
 
     def __init__(self, settings: Settings, embedding_service: EmbeddingService):
         self.settings = settings
         self.embedding_service = embedding_service
+        self._count_cache: Optional[Tuple[float, int]] = None
+        # Bumped on every write so callers can key caches on the collection contents
+        self.version = 0
         self._initialize_db()
 
     def _initialize_db(self):
         """Initialize ChromaDB client and collection."""
-        # Use persistent client for disk storage
-        self.client = chromadb.PersistentClient(
-            path=self.settings.chroma_db_path,
-            settings=ChromaSettings(
-                anonymized_telemetry=False,
-                allow_reset=True
-            )
+        chroma_settings = ChromaSettings(
+            anonymized_telemetry=False,
+            allow_reset=True
         )
 
-        # Get or create collection
-        self.collection = self.client.get_or_create_collection(
-            name=self.settings.collection_name,
-            metadata={"hnsw:space": "cosine"}  # Use cosine similarity
-        )
+        if self.settings.chroma_server_url:
+            # Talk to a shared `chroma run` server so several processes can write
+            url = urlparse(self.settings.chroma_server_url)
+            self.client = chromadb.HttpClient(
+                host=url.hostname or "localhost",
+                port=url.port or 8000,
+                ssl=url.scheme == "https",
+                settings=chroma_settings
+            )
+        else:
+            # Use persistent client for disk storage
+            self.client = chromadb.PersistentClient(
+                path=self.settings.chroma_db_path,
+                settings=chroma_settings
+            )
+
+        # Open the existing collection as-is; get_or_create_collection would try to
+        # overwrite its stored metadata with build params the index never used
+        try:
+            self.collection = self.client.get_collection(name=self.settings.collection_name)
+        except Exception:
+            # Missing (ValueError or NotFoundError depending on the chromadb version),
+            # so create it with the HNSW build params
+            self.collection = self.client.create_collection(
+                name=self.settings.collection_name,
+                metadata={
+                    "hnsw:space": "cosine",  # Use cosine similarity
+                    "hnsw:construction_ef": self.settings.hnsw_construction_ef,
+                    "hnsw:M": self.settings.hnsw_m
+                }
+            )
 
         print(f"Collection '{self.settings.collection_name}' has {self.collection.count()} documents")
 
@@ -39,7 +80,8 @@ class VectorDBService:
         self,
         documents: List[str],
         metadatas: Optional[List[Dict[str, Any]]] = None,
-        ids: Optional[List[str]] = None
+        ids: Optional[List[str]] = None,
+        embeddings: Optional[Union[np.ndarray, List[List[float]]]] = None
     ) -> None:
         """
         Add documents to the vector database.
@@ -48,6 +90,7 @@ class VectorDBService:
             documents: List of document texts
             metadatas: Optional list of metadata dicts for each document
             ids: Optional list of unique IDs (auto-generated if not provided)
+            embeddings: Optional precomputed embeddings (generated if not provided)
         """
         if not documents:
             return
@@ -58,7 +101,8 @@ class VectorDBService:
             ids = [f"doc_{existing_count + i}" for i in range(len(documents))]
 
         # Generate embeddings
-        embeddings = self.embedding_service.embed(documents)
+        if embeddings is None:
+            embeddings = self.embedding_service.embed(documents)
 
         # Add to collection
         self.collection.add(
@@ -68,6 +112,8 @@ class VectorDBService:
             ids=ids
         )
 
+        self._count_cache = None
+        self.version += 1
         print(f"Added {len(documents)} documents to collection")
 
     def query(
@@ -88,7 +134,7 @@ class VectorDBService:
             Dict containing ids, documents, metadatas, and distances
         """
         # Generate query embedding
-        query_embedding = self.embedding_service.embed_query(query_text)
+        query_embedding = self.embedding_service.embed_query_np(query_text)
 
         # Query collection
         results = self.collection.query(
@@ -105,36 +151,131 @@ class VectorDBService:
             "distances": results["distances"][0] if results["distances"] else []
         }
 
+    def query_many(
+        self,
+        query_texts: List[str],
+        n_results: int = 5
+    ) -> List[Dict[str, Any]]:
+        """
+        Query the vector database for several queries at once.
+
+        All queries are embedded in one forward pass and searched in a single
+        collection.query call.
+
+        Args:
+            query_texts: Query texts to find similar documents for
+            n_results: Number of results to return per query
+
+        Returns:
+            One dict per query containing ids, documents, metadatas, and distances
+        """
+        if not query_texts:
+            return []
+
+        query_embeddings = self.embedding_service.embed(query_texts)
+
+        results = self.collection.query(
+            query_embeddings=query_embeddings,
+            n_results=n_results,
+            include=["documents", "metadatas", "distances"]
+        )
+
+        return [
+            {
+                "ids": results["ids"][i],
+                "documents": results["documents"][i],
+                "metadatas": results["metadatas"][i],
+                "distances": results["distances"][i]
+            }
+            for i in range(len(query_texts))
+        ]
+
+    def enable_bulk_load(self) -> Optional[Dict[str, Any]]:
+        """
+        Relax SQLite durability on the calling thread's Chroma connection.
+
+        Chroma keeps one SQLite connection per thread, so this must run on
+        the thread that performs the writes. Relies on Chroma internals and
+        is skipped with a warning if they aren't available.
+
+        Returns:
+            The previous pragma values for restore_bulk_load, or None if skipped
+        """
+        try:
+            from chromadb.db.impl.sqlite import SqliteDB
+
+            conn = self.client._system.instance(SqliteDB)._conn_pool.connect()
+            previous = {
+                name: conn.execute(f"PRAGMA {name}").fetchone()[0]
+                for name in BULK_LOAD_PRAGMAS
+            }
+            for name, value in BULK_LOAD_PRAGMAS.items():
+                conn.execute(f"PRAGMA {name} = {value}")
+        except Exception as e:
+            print(f"Bulk load mode unavailable, continuing with default durability: {e}")
+            return None
+
+        return previous
+
+    def restore_bulk_load(self, previous: Optional[Dict[str, Any]]) -> None:
+        """Restore pragma values saved by enable_bulk_load on the same thread."""
+        if not previous:
+            return
+
+        from chromadb.db.impl.sqlite import SqliteDB
+
+        conn = self.client._system.instance(SqliteDB)._conn_pool.connect()
+        for name, value in previous.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+
     def get_all_documents(self) -> Dict[str, Any]:
-        """Get all documents in the collection."""
+        """Get all documents and metadatas in the collection (loads every row)."""
         return self.collection.get(include=["documents", "metadatas"])
 
+    def get_all_metadatas(self) -> List[Dict[str, Any]]:
+        """Get the metadata of every document, without loading document text."""
+        return self.collection.get(include=["metadatas"]).get("metadatas") or []
+
+    def get_all_ids(self) -> Set[str]:
+        """Get the IDs of every document, without loading text, metadata or embeddings."""
+        return set(self.collection.get(include=[])["ids"])
+
     def delete_all(self) -> None:
         """Delete all documents from the collection."""
-        # Get all IDs
-        all_docs = self.collection.get()
+        # Get all IDs (ids are always returned; skip documents and metadatas)
+        all_docs = self.collection.get(include=[])
         if all_docs["ids"]:
             self.collection.delete(ids=all_docs["ids"])
+            self._count_cache = None
+            self.version += 1
             print(f"Deleted {len(all_docs['ids'])} documents")
 
     def delete_by_source(self, source: str) -> None:
         """Delete all documents from a specific source."""
         all_docs = self.collection.get(
             where={"source": source},
-            include=["metadatas"]
+            include=[]
         )
         if all_docs["ids"]:
             self.collection.delete(ids=all_docs["ids"])
+            self._count_cache = None
+            self.version += 1
             print(f"Deleted {len(all_docs['ids'])} documents from source: {source}")
 
     def count(self) -> int:
-        """Get the number of documents in the collection."""
-        return self.collection.count()
+        """Get the number of documents in the collection (cached for a few seconds)."""
+        now = time.monotonic()
+        if self._count_cache is not None and now - self._count_cache[0] < COUNT_CACHE_TTL:
+            return self._count_cache[1]
+
+        count = self.collection.count()
+        self._count_cache = (now, count)
+        return count
 
     def get_collection_info(self) -> Dict[str, Any]:
         """Get information about the collection."""
         return {
             "name": self.settings.collection_name,
-            "count": self.collection.count(),
+            "count": self.count(),
             "path": self.settings.chroma_db_path
         }
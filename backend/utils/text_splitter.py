@@ -28,28 +28,31 @@ def split_text(
     splitter = RecursiveCharacterTextSplitter(
         chunk_size=chunk_size,
         chunk_overlap=chunk_overlap,
-        separators=["\n\n", "\n", ". ", " ", ""]
+        separators=["\n\n", "\n", ". ", " ", ""],
+        add_start_index=True
     )
 
-    chunks = splitter.split_text(text)
+    # The splitter records each chunk's offset via text.find from the previous
+    # chunk's position; it reports -1 if the chunk cannot be found verbatim
+    documents = splitter.create_documents([text])
 
     result = []
     char_position = 0
 
-    for i, chunk in enumerate(chunks):
-        start_pos = text.find(chunk, char_position)
-        if start_pos == -1:
+    for i, doc in enumerate(documents):
+        chunk = doc.page_content
+        start_pos = doc.metadata["start_index"]
+        if start_pos < 0:
             start_pos = char_position
-        end_pos = start_pos + len(chunk)
 
         result.append({
             "text": chunk,
             "index": i,
             "char_start": start_pos,
-            "char_end": end_pos,
+            "char_end": start_pos + len(chunk),
             "token_count": count_tokens(chunk)
         })
 
-        char_position = start_pos + len(chunk) - chunk_overlap
+        char_position = max(start_pos + len(chunk) - chunk_overlap, 0)
 
     return result
@@ -7,17 +7,25 @@ CLI tool for adding documents to the RAG vector database.
 Usage:
     python vectorize.py --add ./docs/resume.md
     python vectorize.py --add-dir ./portfolio_content/
+    python vectorize.py --add-dir ./portfolio_content/ --workers 4
     python vectorize.py --list
     python vectorize.py --clear
     python vectorize.py --query "What experience does Zach have?"
+    python vectorize.py --queries ./questions.txt
 """
 
 import argparse
+import mmap
 import os
+import queue
 import sys
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Pool
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Iterator, Optional, Set, Tuple
 
+import numpy as np
 from dotenv import load_dotenv
 from rich.console import Console
 from rich.table import Table
@@ -33,32 +41,50 @@ from utils.text_splitter import split_text, count_tokens
 
 console = Console()
 
+SUPPORTED_EXTENSIONS = {".txt", ".md", ".json", ".pdf"}
+
+# Batches allowed to wait between pipeline stages in --add-dir
+PIPELINE_QUEUE_SIZE = 4
+
+
+def _read_text_mmap(file_path: Path) -> str:
+    """Read a UTF-8 text file by decoding straight from a memory map."""
+    with open(file_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return ""
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            text = str(mm, "utf-8")
+
+    # Match text-mode reads, which translate \r\n and \r to \n
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
 
 def parse_document(file_path: Path) -> str:
     """Parse a document and return its text content."""
     suffix = file_path.suffix.lower()
 
     if suffix in [".txt", ".md"]:
-        with open(file_path, "r", encoding="utf-8") as f:
-            return f.read()
+        return _read_text_mmap(file_path)
     elif suffix == ".json":
-        import json
-        with open(file_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            # Convert JSON to readable text
-            if isinstance(data, dict):
-                return json.dumps(data, indent=2)
-            elif isinstance(data, list):
-                return "\n\n".join(json.dumps(item, indent=2) for item in data)
-            return str(data)
+        import orjson
+        with open(file_path, "rb") as f:
+            data = orjson.loads(f.read())
+        # Convert JSON to readable, line-broken text so the splitter has boundaries
+        if isinstance(data, dict):
+            return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode("utf-8")
+        elif isinstance(data, list):
+            return "\n\n".join(
+                orjson.dumps(item, option=orjson.OPT_INDENT_2).decode("utf-8")
+                for item in data
+            )
+        return str(data)
     elif suffix == ".pdf":
         try:
             from pypdf import PdfReader
             reader = PdfReader(file_path)
-            text_parts = []
-            for page in reader.pages:
-                text_parts.append(page.extract_text())
-            return "\n\n".join(text_parts)
+            return "\n\n".join(page.extract_text() for page in reader.pages)
         except ImportError:
             console.print("[red]pypdf not installed. Install with: pip install pypdf[/red]")
             sys.exit(1)
@@ -67,40 +93,39 @@ def parse_document(file_path: Path) -> str:
         return None
 
 
-def add_document(file_path: str, settings, vector_db: VectorDBService) -> int:
-    """Add a single document to the vector database."""
-    path = Path(file_path)
-
-    if not path.exists():
-        console.print(f"[red]File not found: {file_path}[/red]")
-        return 0
-
-    console.print(f"[blue]Processing: {path.name}[/blue]")
-
-    # Parse document
-    text = parse_document(path)
+def prepare_document(
+    file_path: Path,
+    chunk_size: int,
+    chunk_overlap: int
+) -> Optional[Dict[str, Any]]:
+    """
+    Parse and chunk a document without touching the database.
+
+    Args:
+        file_path: Path to the document
+        chunk_size: Size of each chunk (in characters)
+        chunk_overlap: Overlap between chunks
+
+    Returns:
+        Dict with documents, metadatas, ids and total_tokens, or None if no
+        text was extracted
+    """
+    text = parse_document(file_path)
     if not text:
-        return 0
+        return None
 
-    # Count tokens
-    total_tokens = count_tokens(text)
-    console.print(f"  Total tokens: {total_tokens}")
+    chunks = split_text(text, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
 
-    # Split into chunks
-    chunks = split_text(
-        text,
-        chunk_size=settings.chunk_size,
-        chunk_overlap=settings.chunk_overlap
-    )
+    # Per-file values are computed once and shared by every chunk's metadata
+    source = file_path.name
+    source_path = str(file_path)
+    stem = file_path.stem
 
-    console.print(f"  Chunks created: {len(chunks)}")
-
-    # Prepare documents and metadata
     documents = [chunk["text"] for chunk in chunks]
     metadatas = [
         {
-            "source": path.name,
-            "source_path": str(path),
+            "source": source,
+            "source_path": source_path,
             "chunk_index": chunk["index"],
             "char_start": chunk["char_start"],
             "char_end": chunk["char_end"],
@@ -108,16 +133,125 @@ def add_document(file_path: str, settings, vector_db: VectorDBService) -> int:
         }
         for chunk in chunks
     ]
-    ids = [f"{path.stem}_{chunk['index']}" for chunk in chunks]
+    ids = [f"{stem}_{chunk['index']}" for chunk in chunks]
+
+    return {
+        "documents": documents,
+        "metadatas": metadatas,
+        "ids": ids,
+        "total_tokens": count_tokens(text)
+    }
+
+
+def _prepare_worker(task: Tuple[str, int, int]):
+    """Pool entry point: prepare one file and return it with its path."""
+    file_path, chunk_size, chunk_overlap = task
+    return file_path, prepare_document(Path(file_path), chunk_size, chunk_overlap)
+
+
+def _drop_existing(prepared: Dict[str, Any], existing_ids: Set[str]) -> Dict[str, Any]:
+    """
+    Remove chunks whose IDs are already stored, so they are not re-embedded.
+
+    Chroma ignores adds for existing IDs anyway, so this only saves the
+    embedding and write work. Kept IDs are added to existing_ids.
+    """
+    keep = [i for i, chunk_id in enumerate(prepared["ids"]) if chunk_id not in existing_ids]
+    if len(keep) == len(prepared["ids"]):
+        existing_ids.update(prepared["ids"])
+        return prepared
+
+    ids = [prepared["ids"][i] for i in keep]
+    existing_ids.update(ids)
+    return {
+        **prepared,
+        "documents": [prepared["documents"][i] for i in keep],
+        "metadatas": [prepared["metadatas"][i] for i in keep],
+        "ids": ids
+    }
+
+
+def _run_stage(fn: Callable, inbox: "queue.Queue", outbox: Optional["queue.Queue"]) -> None:
+    """
+    Run one pipeline stage until it receives the None sentinel.
+
+    After a failure the stage keeps draining its inbox so upstream stages
+    never block on a full queue; the error is re-raised once the input ends.
+    """
+    error: Optional[BaseException] = None
+    while (item := inbox.get()) is not None:
+        if error is not None:
+            continue
+        try:
+            result = fn(item)
+        except BaseException as e:
+            error = e
+            continue
+        if outbox is not None:
+            outbox.put(result)
 
-    # Add to vector database
-    vector_db.add_documents(documents, metadatas, ids)
+    if outbox is not None:
+        outbox.put(None)
+    if error is not None:
+        raise error
 
-    console.print(f"  [green]Added {len(chunks)} chunks to database[/green]")
-    return len(chunks)
 
+def add_document(file_path: str, settings, vector_db: VectorDBService) -> int:
+    """Add a single document to the vector database."""
+    path = Path(file_path)
+
+    if not path.exists():
+        console.print(f"[red]File not found: {file_path}[/red]")
+        return 0
+
+    console.print(f"[blue]Processing: {path.name}[/blue]")
+
+    # Parse and split into chunks
+    prepared = prepare_document(path, settings.chunk_size, settings.chunk_overlap)
+    if not prepared:
+        return 0
+
+    console.print(f"  Total tokens: {prepared['total_tokens']}")
+    console.print(f"  Chunks created: {len(prepared['documents'])}")
+
+    # Skip chunks that are already in the database
+    prepared = _drop_existing(prepared, vector_db.get_all_ids())
+    documents = prepared["documents"]
+    if not documents:
+        console.print("  [yellow]All chunks already in database, skipping[/yellow]")
+        return 0
 
-def add_directory(dir_path: str, settings, vector_db: VectorDBService) -> int:
+    # Add to vector database
+    vector_db.add_documents(documents, prepared["metadatas"], prepared["ids"])
+
+    console.print(f"  [green]Added {len(documents)} chunks to database[/green]")
+    return len(documents)
+
+
+def _iter_supported(root: str, extensions: Set[str]) -> Iterator[os.DirEntry]:
+    """
+    Recursively yield files under root whose suffix is in extensions.
+
+    Uses os.scandir so file/dir checks reuse the type info returned by
+    readdir instead of issuing a stat per path.
+    """
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _iter_supported(entry.path, extensions)
+            elif os.path.splitext(entry.name)[1].lower() in extensions and entry.is_file():
+                yield entry
+
+
+def add_directory(
+    dir_path: str,
+    settings,
+    vector_db: VectorDBService,
+    workers: int = 1,
+    commit_batch_size: int = 1000,
+    verbose: bool = False,
+    bulk_unsafe: bool = False
+) -> int:
     """Add all documents from a directory to the vector database."""
     path = Path(dir_path)
 
@@ -129,11 +263,8 @@ def add_directory(dir_path: str, settings, vector_db: VectorDBService) -> int:
         console.print(f"[red]Not a directory: {dir_path}[/red]")
         return 0
 
-    # Find all supported files
-    extensions = [".txt", ".md", ".json", ".pdf"]
-    files = []
-    for ext in extensions:
-        files.extend(path.rglob(f"*{ext}"))
+    # Find all supported files in a single walk of the tree
+    files = [entry.path for entry in _iter_supported(str(path), SUPPORTED_EXTENSIONS)]
 
     if not files:
         console.print(f"[yellow]No supported files found in {dir_path}[/yellow]")
@@ -141,18 +272,96 @@ def add_directory(dir_path: str, settings, vector_db: VectorDBService) -> int:
 
     console.print(f"[blue]Found {len(files)} files to process[/blue]")
 
+    tasks = [(f, settings.chunk_size, settings.chunk_overlap) for f in files]
+
+    # Loaded once so re-runs skip already stored chunks without a lookup per file
+    existing_ids = vector_db.get_all_ids()
+
+    # Chunks are buffered across files so each Chroma add (one SQLite
+    # transaction) covers a large batch instead of a handful of rows
+    pending_docs: List[str] = []
+    pending_meta: List[Dict[str, Any]] = []
+    pending_ids: List[str] = []
+
+    # Parse, embed and write run as a pipeline: files are parsed here (or in
+    # the worker pool) while the previous batch is embedded and the one
+    # before that is written. Bounded queues keep memory in check.
+    embed_queue: "queue.Queue" = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    write_queue: "queue.Queue" = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+
+    def embed_batch(batch):
+        documents, metadatas, ids = batch
+        return documents, metadatas, ids, vector_db.embedding_service.encode_batch(documents)
+
+    def write_batch(batch):
+        documents, metadatas, ids, embeddings = batch
+        vector_db.add_documents(documents, metadatas, ids, embeddings=embeddings)
+
+    def write_stage():
+        # Pragmas are per connection and Chroma pools connections per thread,
+        # so bulk mode is switched on and off from the writer thread itself
+        previous = vector_db.enable_bulk_load() if bulk_unsafe else None
+        try:
+            _run_stage(write_batch, write_queue, None)
+        finally:
+            vector_db.restore_bulk_load(previous)
+
+    def flush():
+        nonlocal pending_docs, pending_meta, pending_ids
+        if pending_ids:
+            embed_queue.put((pending_docs, pending_meta, pending_ids))
+            pending_docs, pending_meta, pending_ids = [], [], []
+
     total_chunks = 0
     with Progress(
         SpinnerColumn(),
         TextColumn("[progress.description]{task.description}"),
         console=console
-    ) as progress:
+    ) as progress, ThreadPoolExecutor(max_workers=2) as stages:
         task = progress.add_task("Processing files...", total=len(files))
 
-        for file_path in files:
-            chunks_added = add_document(str(file_path), settings, vector_db)
-            total_chunks += chunks_added
-            progress.advance(task)
+        embedder = stages.submit(_run_stage, embed_batch, embed_queue, write_queue)
+        # Single writer thread: Chroma's SQLite store doesn't tolerate concurrent writers
+        writer = stages.submit(write_stage)
+
+        # Parsing and chunking run in worker processes when --workers > 1
+        pool = Pool(workers) if workers > 1 else None
+        try:
+            if pool:
+                results = pool.imap_unordered(_prepare_worker, tasks)
+            else:
+                results = map(_prepare_worker, tasks)
+
+            for file_path, prepared in results:
+                name = os.path.basename(file_path)
+                n_chunks = 0
+                if prepared:
+                    prepared = _drop_existing(prepared, existing_ids)
+                    documents = prepared["documents"]
+                    n_chunks = len(documents)
+                    pending_docs.extend(documents)
+                    pending_meta.extend(prepared["metadatas"])
+                    pending_ids.extend(prepared["ids"])
+                    total_chunks += n_chunks
+
+                    if len(pending_ids) >= commit_batch_size:
+                        flush()
+
+                # Status goes in the progress line; per-file prints only when asked
+                if verbose:
+                    console.print(f"  [green]{name}: {n_chunks} chunks[/green]")
+                progress.update(task, advance=1, description=f"{name}: {n_chunks} chunks")
+
+            flush()
+        finally:
+            embed_queue.put(None)
+            if pool:
+                pool.close()
+                pool.join()
+
+        progress.update(task, description="Finishing embeddings and writes...")
+        embedder.result()
+        writer.result()
 
     console.print(f"\n[green]Total chunks added: {total_chunks}[/green]")
     return total_chunks
@@ -166,14 +375,12 @@ def list_documents(vector_db: VectorDBService):
     console.print(f"Path: {info['path']}")
 
     if info['count'] > 0:
-        all_docs = vector_db.get_all_documents()
+        all_metadatas = vector_db.get_all_metadatas()
 
         # Group by source
-        sources: Dict[str, int] = {}
-        for meta in all_docs.get("metadatas", []):
-            if meta:
-                source = meta.get("source", "unknown")
-                sources[source] = sources.get(source, 0) + 1
+        sources = Counter(
+            meta.get("source", "unknown") for meta in all_metadatas if meta
+        )
 
         if sources:
             console.print("\n[bold]Documents by source:[/bold]")
@@ -189,27 +396,50 @@ def list_documents(vector_db: VectorDBService):
 
 def query_documents(query: str, vector_db: VectorDBService, settings):
     """Query the vector database and show results."""
-    console.print(f"\n[bold]Query:[/bold] {query}")
-
     results = vector_db.query(query, n_results=settings.retrieval_k)
+    _print_query_results(query, results)
+
+
+def query_documents_batch(queries_file: str, vector_db: VectorDBService, settings):
+    """Run every query in a file (one per line) with a single embedding pass."""
+    path = Path(queries_file)
+    if not path.exists():
+        console.print(f"[red]File not found: {queries_file}[/red]")
+        return
+
+    queries = [line.strip() for line in path.read_text(encoding="utf-8").splitlines()]
+    queries = [q for q in queries if q]
+    if not queries:
+        console.print(f"[yellow]No queries found in {queries_file}[/yellow]")
+        return
+
+    all_results = vector_db.query_many(queries, n_results=settings.retrieval_k)
+    for query, results in zip(queries, all_results):
+        _print_query_results(query, results)
+
+
+def _print_query_results(query: str, results: Dict[str, Any]):
+    """Print the results of one query."""
+    console.print(f"\n[bold]Query:[/bold] {query}")
 
     if not results["documents"]:
         console.print("[yellow]No results found[/yellow]")
         return
 
-    console.print(f"\n[bold]Top {len(results['documents'])} results:[/bold]")
+    # VectorDBService.query already unwraps Chroma's per-query nesting
+    docs = results["documents"]
+    metas = results["metadatas"]
+    similarities = np.round(1 - np.asarray(results["distances"], dtype=np.float64), 3)
+
+    console.print(f"\n[bold]Top {len(docs)} results:[/bold]")
 
-    for i, (doc, meta, dist) in enumerate(zip(
-        results["documents"],
-        results["metadatas"],
-        results["distances"]
-    ), 1):
-        similarity = round(1 - dist, 3)
+    for i in range(len(docs)):
+        meta = metas[i]
         source = meta.get("source", "unknown") if meta else "unknown"
 
-        console.print(f"\n[cyan]Result {i}[/cyan] (similarity: {similarity})")
+        console.print(f"\n[cyan]Result {i + 1}[/cyan] (similarity: {similarities[i]})")
         console.print(f"Source: {source}")
-        console.print(f"Content: {doc[:200]}...")
+        console.print(f"Content: {docs[i][:200]}...")
 
 
 def clear_database(vector_db: VectorDBService):
@@ -257,12 +487,42 @@ def main():
         metavar="TEXT",
         help="Query the database and show results"
     )
+    group.add_argument(
+        "--queries",
+        metavar="FILE",
+        help="Run every query in FILE (one per line) in a single batch"
+    )
     group.add_argument(
         "--clear",
         action="store_true",
         help="Clear all documents from the database"
     )
 
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Worker processes for parsing and chunking with --add-dir (default: 1)"
+    )
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="Print a line per file with --add-dir"
+    )
+    parser.add_argument(
+        "--bulk-unsafe",
+        action="store_true",
+        help="Disable SQLite journaling/fsync during --add-dir (re-run if it crashes)"
+    )
+    parser.add_argument(
+        "--commit-batch-size",
+        type=int,
+        default=1000,
+        metavar="N",
+        help="Chunks to buffer across files before each database write (default: 1000)"
+    )
+
     args = parser.parse_args()
 
     # Initialize services
@@ -277,11 +537,21 @@ def main():
     if args.add:
         add_document(args.add, settings, vector_db)
     elif args.add_dir:
-        add_directory(args.add_dir, settings, vector_db)
+        add_directory(
+            args.add_dir,
+            settings,
+            vector_db,
+            workers=args.workers,
+            commit_batch_size=args.commit_batch_size,
+            verbose=args.verbose,
+            bulk_unsafe=args.bulk_unsafe
+        )
     elif args.list:
         list_documents(vector_db)
     elif args.query:
         query_documents(args.query, vector_db, settings)
+    elif args.queries:
+        query_documents_batch(args.queries, vector_db, settings)
     elif args.clear:
         clear_database(vector_db)
 
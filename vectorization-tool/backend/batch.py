@@ -47,7 +47,9 @@ def cli():
 @click.option("--chunk-overlap", default=50, help="Overlap between chunks")
 @click.option("--recursive/--no-recursive", default=True, help="Process subdirectories")
 @click.option("--skip-existing/--no-skip-existing", default=True, help="Skip already processed files")
-def process(path, collection, db_path, model, strategy, chunk_size, chunk_overlap, recursive, skip_existing):
+@click.option("--workers", "-w", default=1, type=click.IntRange(min=1),
+              help="Worker processes for parsing and chunking")
+def process(path, collection, db_path, model, strategy, chunk_size, chunk_overlap, recursive, skip_existing, workers):
     """Process files or directory into vector database.
 
     PATH can be a single file or a directory.
@@ -65,6 +67,9 @@ def process(path, collection, db_path, model, strategy, chunk_size, chunk_overla
 
         # Use semantic chunking
         python batch.py process ./docs/ --strategy semantic
+
+        # Parse and chunk with 4 processes
+        python batch.py process ./docs/ --workers 4
     """
     openai_key = os.getenv("OPENAI_API_KEY")
 
@@ -143,7 +148,9 @@ def process(path, collection, db_path, model, strategy, chunk_size, chunk_overla
             def dir_callback(msg, current, total):
                 progress.update(task, completed=current, description=msg)
 
-            batch_result = service.process_files(files, config, progress_callback=dir_callback)
+            batch_result = service.process_files(
+                files, config, progress_callback=dir_callback, workers=workers
+            )
 
     # Display results
     _display_results(batch_result)
@@ -1,12 +1,15 @@
 #!/usr/bin/env python3
 """Canvas LMS scraper for vectorizing course materials."""
 
+import asyncio
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import click
+import numpy as np
 from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn
 from rich.table import Table
@@ -16,9 +19,9 @@ from dotenv import load_dotenv
 # Add the backend directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent))
 
-from services.canvas_client import CanvasClient, CanvasConfig, CanvasFile
+from services.canvas_client import CanvasClient, CanvasConfig, CanvasFile, DOWNLOAD_CONCURRENCY
 from services.file_tracker import FileTracker
-from services.batch_service import BatchService, BatchConfig
+from services.batch_service import BatchService, BatchConfig, EMBED_SUPER_BATCH_SIZE, prepare_file_in_worker
 from services.markdown_converter import get_supported_formats
 
 # Load environment variables
@@ -26,6 +29,9 @@ load_dotenv()
 
 console = Console()
 
+# Number of pending files listed in the scrape preview table
+PREVIEW_ROWS = 20
+
 
 def get_canvas_client() -> CanvasClient:
     """Create Canvas client from environment."""
@@ -63,8 +69,14 @@ def cli():
 @click.option("--force", "-f", is_flag=True, help="Re-process already processed files")
 @click.option("--yes", "-y", is_flag=True, help="Skip confirmation")
 @click.option("--keep-downloads/--no-keep-downloads", default=True)
+@click.option("--concurrency", default=DOWNLOAD_CONCURRENCY, type=click.IntRange(min=1),
+              help="Maximum parallel downloads")
+@click.option("--workers", "-w", default=os.cpu_count() or 1, type=click.IntRange(min=1),
+              help="Worker processes for text extraction and chunking")
+@click.option("--dimensions", type=int, default=None,
+              help="Shortened embedding size for text-embedding-3 models (e.g. 1024)")
 def scrape(courses, collection, db_path, download_dir, model, strategy, chunk_size,
-           include_assignments, force, yes, keep_downloads):
+           include_assignments, force, yes, keep_downloads, concurrency, workers, dimensions):
     """Scrape and vectorize materials from Canvas courses.
 
     COURSES can be course IDs or search terms (course codes/names).
@@ -82,16 +94,27 @@ def scrape(courses, collection, db_path, download_dir, model, strategy, chunk_si
 
         # Include assignment files
         python canvas_scraper.py scrape CS5100 --include-assignments
+
+        # Store 1024-dim vectors instead of 3072 (a third of the index memory)
+        python canvas_scraper.py scrape DS4400 --model text-embedding-3-large --dimensions 1024
     """
     canvas = get_canvas_client()
     tracker = FileTracker()
     batch_service = BatchService(openai_api_key=os.getenv("OPENAI_API_KEY"))
 
+    if dimensions:
+        model_info = batch_service.embedding_service.get_model_info(model) or {}
+        if dimensions not in model_info.get("dimension_options", []):
+            raise click.BadParameter(
+                f"{model} does not support {dimensions} dimensions", param_hint="--dimensions"
+            )
+
     batch_config = BatchConfig(
         chunking_strategy=strategy,
         chunk_size=chunk_size,
         chunk_overlap=50,
         embedding_model=model,
+        embedding_dimensions=dimensions,
         collection_name=collection,
         persist_directory=db_path,
         skip_existing=not force
@@ -149,17 +172,15 @@ def scrape(courses, collection, db_path, download_dir, model, strategy, chunk_si
     with Progress(SpinnerColumn(), TextColumn("[progress.description]{task.description}"), console=console) as progress:
         task = progress.add_task("Scanning...", total=len(unique_courses))
 
-        for course in unique_courses:
-            course_id = course["id"]
-            course_name = course.get("name", f"Course {course_id}")
-
-            files = canvas.discover_all_files(
-                course_id,
-                include_assignments=include_assignments,
-                progress_callback=lambda msg: progress.update(task, description=msg)
-            )
+        # Courses are scanned concurrently; results come back in course order
+        files_per_course = asyncio.run(canvas.discover_courses_async(
+            [course["id"] for course in unique_courses],
+            include_assignments=include_assignments,
+            progress_callback=lambda msg: progress.update(task, description=msg),
+            course_done_callback=lambda course_id, files: progress.advance(task)
+        ))
+        for files in files_per_course:
             all_files.extend(files)
-            progress.advance(task)
 
     console.print(f"\n[bold]Found {len(all_files)} total files[/bold]")
 
@@ -171,11 +192,18 @@ def scrape(courses, collection, db_path, download_dir, model, strategy, chunk_si
     files_to_process = []
     files_to_skip = []
 
+    # One query for the whole collection instead of one per file
+    processed = {} if force else tracker.get_processed_map(collection)
+
+    # Files that look updated are fetched with If-None-Match; an unchanged ETag skips embedding
+    etags = {} if force else tracker.get_etags(collection)
+
     for f in all_files:
-        if force or not tracker.is_processed(str(f.id), collection, f.modified_at):
-            files_to_process.append(f)
-        else:
+        file_id = str(f.id)
+        if file_id in processed and tracker.is_current(processed[file_id], f.modified_at):
             files_to_skip.append(f)
+        else:
+            files_to_process.append(f)
 
     console.print(f"  New/updated files: {len(files_to_process)}")
     console.print(f"  Already processed: {len(files_to_skip)}")
@@ -192,16 +220,15 @@ def scrape(courses, collection, db_path, download_dir, model, strategy, chunk_si
     table.add_column("Source", style="dim", max_width=20)
     table.add_column("Size", style="green")
 
-    for f in files_to_process[:20]:
-        table.add_row(
-            f.course_name[:25],
-            f.display_name[:35],
-            f.source[:20],
-            f"{f.size / 1024:.1f} KB"
-        )
+    rows = [
+        (f.course_name[:25], f.display_name[:35], f.source[:20], f"{f.size / 1024:.1f} KB")
+        for f in files_to_process[:PREVIEW_ROWS]
+    ]
+    if len(files_to_process) > PREVIEW_ROWS:
+        rows.append(("...", f"... and {len(files_to_process) - PREVIEW_ROWS} more", "", ""))
 
-    if len(files_to_process) > 20:
-        table.add_row("...", f"... and {len(files_to_process) - 20} more", "", "")
+    for row in rows:
+        table.add_row(*row)
 
     console.print(table)
 
@@ -214,6 +241,7 @@ def scrape(courses, collection, db_path, download_dir, model, strategy, chunk_si
 
     successful = 0
     failed = 0
+    unchanged = 0
     total_chunks = 0
 
     with Progress(
@@ -223,47 +251,90 @@ def scrape(courses, collection, db_path, download_dir, model, strategy, chunk_si
         TaskProgressColumn(),
         console=console
     ) as progress:
+        download_task = progress.add_task("Downloading...", total=len(files_to_process))
         task = progress.add_task("Processing...", total=len(files_to_process))
 
-        for canvas_file in files_to_process:
-            progress.update(task, description=f"Downloading {canvas_file.display_name[:40]}...")
+        # Prepared files waiting to be embedded together, with their chunk total
+        pending: List[Tuple[CanvasFile, Dict[str, Any]]] = []
+        pending_chunks = 0
+
+        def flush():
+            nonlocal successful, failed, total_chunks, pending, pending_chunks
+            if not pending:
+                return
+
+            progress.update(task, description=f"Embedding {pending_chunks} chunks from {len(pending)} files...")
+            results = batch_service.embed_and_upsert([prepared for _, prepared in pending])
+
+            for (canvas_file, _), result in zip(pending, results):
+                if result.success:
+                    successful += 1
+                    total_chunks += result.chunks_created
+
+                    # Track the file
+                    tracker.mark_processed(
+                        file_id=str(canvas_file.id),
+                        filename=canvas_file.display_name,
+                        course_id=str(canvas_file.course_id),
+                        course_name=canvas_file.course_name,
+                        source=canvas_file.source,
+                        collection_name=collection,
+                        chunk_count=result.chunks_created,
+                        file_size=canvas_file.size,
+                        canvas_modified_at=canvas_file.modified_at,
+                        etag=canvas_file.etag
+                    )
+                else:
+                    failed += 1
+                    if result.error and "already exists" not in result.error:
+                        console.print(f"\n[dim red]Failed: {canvas_file.display_name}: {result.error}[/dim red]")
+
+                progress.advance(task)
+
+            pending = []
+            pending_chunks = 0
 
-            # Download
-            local_path = canvas.download_file(canvas_file, download_dir)
+        def store(canvas_file: CanvasFile, prepared: Optional[Dict[str, Any]]):
+            nonlocal failed, pending_chunks
 
-            if not local_path:
+            if prepared is None:
                 failed += 1
                 progress.advance(task)
-                continue
-
-            progress.update(task, description=f"Vectorizing {canvas_file.display_name[:40]}...")
-
-            # Process
-            result = batch_service.process_file(local_path, batch_config)
-
-            if result.success:
-                successful += 1
-                total_chunks += result.chunks_created
-
-                # Track the file
-                tracker.mark_processed(
-                    file_id=str(canvas_file.id),
-                    filename=canvas_file.display_name,
-                    course_id=str(canvas_file.course_id),
-                    course_name=canvas_file.course_name,
-                    source=canvas_file.source,
-                    collection_name=collection,
-                    chunk_count=result.chunks_created,
-                    file_size=canvas_file.size,
-                    canvas_modified_at=canvas_file.modified_at
-                )
-            else:
-                failed += 1
-                if result.error and "already exists" not in result.error:
-                    console.print(f"\n[dim red]Failed: {canvas_file.display_name}: {result.error}[/dim red]")
+                return
+
+            # Embedding waits until enough chunks have accumulated across files
+            pending.append((canvas_file, prepared))
+            pending_chunks += len(prepared.get("chunk_texts", ()))
+
+            if pending_chunks >= EMBED_SUPER_BATCH_SIZE:
+                flush()
+
+        def mark_unchanged(canvas_file: CanvasFile):
+            nonlocal unchanged
 
+            # Content matches what was embedded last time; only the timestamp moved
+            tracker.mark_current(str(canvas_file.id), collection, canvas_file.modified_at)
+            unchanged += 1
             progress.advance(task)
 
+        def on_downloaded(canvas_file: CanvasFile, local_path: Optional[str]):
+            progress.update(download_task, description=f"Downloaded {canvas_file.display_name[:40]}")
+            progress.advance(download_task)
+
+        asyncio.run(_download_and_vectorize(
+            canvas,
+            files_to_process,
+            download_dir,
+            batch_config,
+            concurrency,
+            workers,
+            etags,
+            store,
+            mark_unchanged,
+            on_downloaded
+        ))
+        flush()
+
     # Summary
     summary = Table(title="Processing Summary")
     summary.add_column("Metric", style="cyan")
@@ -271,7 +342,7 @@ def scrape(courses, collection, db_path, download_dir, model, strategy, chunk_si
 
     summary.add_row("Files Processed", str(successful))
     summary.add_row("Files Failed", str(failed))
-    summary.add_row("Files Skipped", str(len(files_to_skip)))
+    summary.add_row("Files Skipped", str(len(files_to_skip) + unchanged))
     summary.add_row("Total Chunks Created", str(total_chunks))
     summary.add_row("Collection", collection)
 
@@ -380,33 +451,54 @@ def search(query, collection, db_path, model, results):
 
     batch_service = BatchService(openai_api_key=os.getenv("OPENAI_API_KEY"))
 
-    console.print(f"Searching: [bold]{query}[/bold]")
-
     try:
-        result = batch_service.query(query, batch_config, n_results=results)
+        _open_search_collection(batch_service, batch_config)
+    except Exception as e:
+        console.print(f"[red]Error:[/red] {e}")
+        return
 
-        if not result["results"]:
-            console.print("[yellow]No results found.[/yellow]")
-            return
+    _run_search(batch_service, query, batch_config, results)
 
-        table = Table(title=f"Results ({result['count']})")
-        table.add_column("#", style="dim", width=3)
-        table.add_column("File", style="cyan", max_width=30)
-        table.add_column("Score", style="green", width=8)
-        table.add_column("Content", max_width=50)
 
-        for i, r in enumerate(result["results"], 1):
-            filename = r["metadata"].get("filename", "Unknown")
-            # Convert distance to similarity score (0-100)
-            distance = r.get("distance", 0)
-            score = max(0, 100 - distance * 50)  # Rough conversion
-            preview = r["content"][:100].replace("\n", " ").strip()
-            table.add_row(str(i), filename[:30], f"{score:.0f}", preview + "...")
+@cli.command()
+@click.option("--collection", "-c", default="canvas_materials")
+@click.option("--db-path", "-d", default="./canvas_chroma_db")
+@click.option("--model", "-m", default="sentence-transformers/all-MiniLM-L6-v2")
+@click.option("--results", "-n", default=5)
+def serve(collection, db_path, model, results):
+    """Interactive search that keeps the model and ChromaDB loaded between queries.
 
-        console.print(table)
+    Each line typed is run as a search. Enter 'quit' or press Ctrl-D to exit.
+    """
+    batch_config = BatchConfig(
+        embedding_model=model,
+        collection_name=collection,
+        persist_directory=db_path
+    )
 
+    batch_service = BatchService(openai_api_key=os.getenv("OPENAI_API_KEY"))
+
+    try:
+        with console.status("Loading model and collection..."):
+            batch_service.embedding_service.warmup(model)
+            coll = _open_search_collection(batch_service, batch_config)
     except Exception as e:
         console.print(f"[red]Error:[/red] {e}")
+        return
+
+    console.print(f"Searching [bold]{collection}[/bold] ({coll.count()} chunks). Type a query, or 'quit' to exit.")
+
+    while True:
+        try:
+            query = console.input("\n[bold cyan]search>[/bold cyan] ").strip()
+        except (EOFError, KeyboardInterrupt):
+            console.print()
+            break
+
+        if query.lower() in ("quit", "exit"):
+            break
+        if query:
+            _run_search(batch_service, query, batch_config, results)
 
 
 @cli.command()
@@ -452,6 +544,116 @@ def formats():
     console.print(f"\n[dim]Total: {len(formats_info['all_extensions'])} formats[/dim]")
 
 
+async def _download_and_vectorize(
+    canvas: CanvasClient,
+    files: List[CanvasFile],
+    download_dir: str,
+    batch_config: BatchConfig,
+    concurrency: int,
+    workers: int,
+    etags: Dict[str, str],
+    store: Callable[[CanvasFile, Optional[Dict[str, Any]]], None],
+    mark_unchanged: Callable[[CanvasFile], None],
+    on_downloaded: Callable[[CanvasFile, Optional[str]], None]
+):
+    """
+    Download, extract and store files as a three-stage pipeline.
+
+    Downloads run concurrently on the event loop. Each finished download is
+    parsed and chunked in a process pool (text extraction is CPU-bound), and
+    prepared files feed a queue that a single consumer drains, running
+    `store` on a worker thread. One consumer keeps ChromaDB and the tracker
+    to a single writer. `store` receives None for files that failed to
+    download. Files whose ETag matches `etags` go to `mark_unchanged`
+    instead, without being parsed or embedded.
+    """
+    loop = asyncio.get_running_loop()
+    work_queue: asyncio.Queue = asyncio.Queue()
+    prepare_tasks: List[asyncio.Task] = []
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        async def prepare(canvas_file: CanvasFile, local_path: Optional[str]):
+            if local_path and canvas_file.etag and canvas_file.etag == etags.get(str(canvas_file.id)):
+                work_queue.put_nowait((mark_unchanged, canvas_file))
+                return
+
+            prepared = None
+            if local_path:
+                prepared = await loop.run_in_executor(
+                    pool, prepare_file_in_worker, local_path, batch_config
+                )
+            work_queue.put_nowait((store, canvas_file, prepared))
+
+        def enqueue(canvas_file: CanvasFile, local_path: Optional[str]):
+            on_downloaded(canvas_file, local_path)
+            prepare_tasks.append(asyncio.create_task(prepare(canvas_file, local_path)))
+
+        async def consume():
+            while (item := await work_queue.get()) is not None:
+                handler, *args = item
+                await asyncio.to_thread(handler, *args)
+
+        consumer = asyncio.create_task(consume())
+        try:
+            await canvas.download_files_async(
+                files,
+                download_dir,
+                concurrency=concurrency,
+                progress_callback=enqueue,
+                etags=etags
+            )
+            await asyncio.gather(*prepare_tasks)
+        finally:
+            # Sentinel: stop once every prepared file has been stored
+            work_queue.put_nowait(None)
+            await consumer
+
+
+def _open_search_collection(batch_service: BatchService, batch_config: BatchConfig):
+    """Open the collection to search (without creating it) and match its query dimensions."""
+    coll = batch_service.get_collection(batch_config)
+    batch_config.embedding_dimensions = batch_service.query_dimensions(
+        batch_config.embedding_model, coll.metadata
+    )
+    return coll
+
+
+def _run_search(batch_service: BatchService, query: str, batch_config: BatchConfig, results: int):
+    """Run one search and print the results table."""
+    console.print(f"Searching: [bold]{query}[/bold]")
+
+    try:
+        result = batch_service.query(query, batch_config, n_results=results)
+
+        if not result["results"]:
+            console.print("[yellow]No results found.[/yellow]")
+            return
+
+        table = Table(title=f"Results ({result['count']})")
+        table.add_column("#", style="dim", width=3)
+        table.add_column("File", style="cyan", max_width=30)
+        table.add_column("Score", style="green", width=8)
+        table.add_column("Content", max_width=50)
+
+        # Cosine similarity as a 0-100 score, converted for all results at once
+        similarities = np.fromiter(
+            (r.get("similarity", 0) for r in result["results"]),
+            dtype=np.float64,
+            count=len(result["results"])
+        )
+        scores = np.clip(100 * similarities, 0, None)
+
+        for i, (r, score) in enumerate(zip(result["results"], scores), 1):
+            filename = r["metadata"].get("filename", "Unknown")
+            preview = r["content"][:100].replace("\n", " ").strip()
+            table.add_row(str(i), filename[:30], f"{score:.0f}", preview + "...")
+
+        console.print(table)
+
+    except Exception as e:
+        console.print(f"[red]Error:[/red] {e}")
+
+
 def _show_stats(tracker: FileTracker, collection: Optional[str]):
     """Display statistics."""
     stats = tracker.get_stats(collection)
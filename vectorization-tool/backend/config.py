@@ -1,6 +1,6 @@
 """Application configuration for Vectorization Tool."""
 
-from functools import lru_cache
+from functools import cached_property, lru_cache
 from pydantic_settings import BaseSettings
 from typing import List
 
@@ -30,13 +30,19 @@ class Settings(BaseSettings):
     # Default embedding model
     default_embedding_model: str = "text-embedding-3-large"
 
+    # Local embedding model loaded at startup so the first request doesn't pay for it (empty to skip)
+    warmup_embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2"
+
+    # Reuse retrieval results for repeated chat questions (CHAT_QUERY_CACHE=false to disable)
+    chat_query_cache: bool = True
+
     # Database paths
     db_path: str = "./data/canvas_tracker.db"
     chroma_persist_dir: str = "./canvas_chroma_db"
 
-    @property
+    @cached_property
     def origins_list(self) -> List[str]:
-        """Parse allowed origins into a list."""
+        """Parse allowed origins into a list (once per settings instance)."""
         return [origin.strip() for origin in self.allowed_origins.split(",")]
 
     class Config:
@@ -15,6 +15,10 @@ from config import get_settings
 from routers import documents, chunking, embeddings, visualization, export, batch
 from routers import assignments, calendar, cron, chat
 from services.database_service import DatabaseService
+from services.embedding_service import EmbeddingService
+from services.batch_service import BatchService
+from services.assignment_service import AssignmentService
+from services.generation_service import GenerationService
 from services.scheduler_service import SchedulerService
 from services.job_handlers import JobHandlers
 
@@ -48,11 +52,49 @@ async def lifespan(app: FastAPI):
     scheduler.start()
     logger.info("Scheduler started")
 
+    # Shared embedding service; load the default local model now rather than on first request
+    embedding_service = EmbeddingService(openai_api_key=settings.openai_api_key)
+    app.state.embedding_service = embedding_service
+    if settings.warmup_embedding_model:
+        try:
+            embedding_service.warmup(settings.warmup_embedding_model)
+            logger.info(f"Embedding model loaded: {settings.warmup_embedding_model}")
+        except Exception as e:
+            logger.warning(f"Embedding model warmup failed: {e}")
+
+    # Batch service shared by every request, so its Chroma clients and query-embedding LRU persist
+    app.state.batch_service = BatchService(
+        openai_api_key=settings.openai_api_key,
+        embedding_service=embedding_service
+    )
+
+    # Open the chat assistant's vector store now rather than on the first /chat request
+    try:
+        chat.get_vector_collection()
+    except Exception as e:
+        logger.warning(f"Chat vector store not loaded: {e}")
+
+    # Assignment services shared by every request (one Canvas session, OpenAI client and Chroma client)
+    app.state.assignment_service = AssignmentService(
+        db=db,
+        canvas_api_url=settings.canvas_api_url,
+        canvas_api_token=settings.canvas_api_token,
+        openai_api_key=settings.openai_api_key,
+        chroma_persist_dir=getattr(settings, 'chroma_persist_dir', './canvas_chroma_db'),
+        embedding_service=embedding_service
+    )
+    app.state.generation_service = GenerationService(
+        db=db,
+        assignment_service=app.state.assignment_service,
+        openai_api_key=settings.openai_api_key
+    )
+
     print(f"Vectorization Tool API started on port {settings.port}")
     yield
 
     # Shutdown
     scheduler.shutdown(wait=True)
+    app.state.assignment_service.canvas_client.close()
     logger.info("Scheduler shutdown")
     print("Shutting down Vectorization Tool API...")
 
@@ -73,6 +115,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Let the browser read pagination and revalidation headers
+    expose_headers=["Link", "ETag"],
 )
 
 # Include routers
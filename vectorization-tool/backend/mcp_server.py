@@ -3,14 +3,28 @@
 
 This server exposes the vectorized Canvas materials to AI models
 via the Model Context Protocol (MCP).
+
+By default it speaks stdio, so every client session starts a fresh process.
+Run it with `--transport sse` to keep one warm server (ChromaDB client,
+embedding model, query caches) on http://127.0.0.1:8765/sse instead.
 """
 
+import argparse
+import asyncio
 import os
+import re
 import sys
+import threading
+from collections import Counter
+from functools import lru_cache
+from operator import itemgetter
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
 from dataclasses import dataclass
 
+import chromadb
+import orjson
+from chromadb.config import Settings
 from dotenv import load_dotenv
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
@@ -24,6 +38,25 @@ from services.file_tracker import FileTracker
 
 load_dotenv()
 
+# How long the first search in a batch waits for others to share its embedding call
+QUERY_BATCH_WINDOW = 0.01
+
+# Maximum number of queries embedded in one call
+QUERY_BATCH_MAX = 64
+
+# Collections whose per-file metadata summary is kept in memory
+COLLECTION_INDEX_CACHE_SIZE = 16
+
+# Metadata rows fetched per ChromaDB get() when scanning a whole collection
+METADATA_PAGE_SIZE = 10_000
+
+# Default bind address for the long-running SSE transport (local clients only)
+SSE_HOST = "127.0.0.1"
+SSE_PORT = 8765
+
+# First path component containing a course code (EECE2310, DS4420, etc.)
+_COURSE_RE = re.compile(r"(?:^|/)([^/]*(?:EECE|DS44|PHIL|CS|MATH)[^/]*)(?=/|$)", re.IGNORECASE)
+
 
 @dataclass
 class MCPConfig:
@@ -35,125 +68,212 @@ class MCPConfig:
     max_results: int = 20
 
 
+class QueryBatcher:
+    """
+    Coalesces concurrent search queries into a single embedding call.
+
+    The first query for a model opens a batch and waits QUERY_BATCH_WINDOW
+    for others; the batch is then embedded in one request (one OpenAI
+    round-trip instead of one per query). Cached queries skip the wait.
+    """
+
+    def __init__(self, service: BatchService):
+        self.service = service
+        self._pending: Dict[Tuple[str, Optional[int], str], List[Tuple[str, asyncio.Future]]] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def embed(self, query: str, batch_config: BatchConfig) -> List[float]:
+        """Embed a query, sharing the embedding call with concurrent queries."""
+        cached = self.service.get_cached_query_embedding(query, batch_config)
+        if cached is not None:
+            return cached
+
+        key = (batch_config.embedding_model, batch_config.embedding_dimensions, batch_config.persist_directory)
+        future = asyncio.get_running_loop().create_future()
+
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = self._pending[key] = []
+            self._spawn(self._flush_after_window(key, batch, batch_config))
+        batch.append((query, future))
+
+        if len(batch) >= QUERY_BATCH_MAX and self._take(key, batch):
+            self._spawn(self._embed_batch(batch, batch_config))
+
+        return await future
+
+    def _spawn(self, coro):
+        # Keep a reference so the task isn't garbage collected mid-flight
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _take(self, key, batch) -> bool:
+        """Close a batch to new queries; False if it was already taken."""
+        if self._pending.get(key) is batch:
+            del self._pending[key]
+            return True
+        return False
+
+    async def _flush_after_window(self, key, batch, batch_config: BatchConfig):
+        await asyncio.sleep(QUERY_BATCH_WINDOW)
+        if self._take(key, batch):
+            await self._embed_batch(batch, batch_config)
+
+    async def _embed_batch(self, batch, batch_config: BatchConfig):
+        try:
+            embeddings = await asyncio.to_thread(
+                self.service.embed_queries, [query for query, _ in batch], batch_config
+            )
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), embedding in zip(batch, embeddings):
+            if not future.done():
+                future.set_result(embedding)
+
+
 # Initialize the MCP server
 server = Server("canvas-vector-store")
 config = MCPConfig()
 batch_service = BatchService(openai_api_key=os.getenv("OPENAI_API_KEY"))
+query_batcher = QueryBatcher(batch_service)
 tracker = FileTracker()
 
+# ChromaDB client shared by every tool call, opened on first use
+_chroma_client: Optional[chromadb.ClientAPI] = None
+_chroma_client_lock = threading.Lock()
 
-@server.list_tools()
-async def list_tools() -> list[Tool]:
-    """Return available MCP tools."""
-    return [
-        Tool(
-            name="search_canvas",
-            description="Search through vectorized Canvas course materials (lecture slides, PDFs, documents). Use this to find relevant information from your classes.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "query": {
-                        "type": "string",
-                        "description": "The search query - describe what you're looking for"
-                    },
-                    "num_results": {
-                        "type": "integer",
-                        "description": "Number of results to return (default: 5, max: 20)",
-                        "default": 5
-                    },
-                    "collection": {
-                        "type": "string",
-                        "description": "Collection to search (default: canvas_materials)",
-                        "default": "canvas_materials"
-                    }
+
+def _get_chroma_client() -> chromadb.ClientAPI:
+    """Get the shared ChromaDB client for the configured database."""
+    global _chroma_client
+    with _chroma_client_lock:
+        if _chroma_client is None:
+            _chroma_client = chromadb.PersistentClient(
+                path=config.db_path,
+                settings=Settings(anonymized_telemetry=False)
+            )
+        return _chroma_client
+
+
+# Tool definitions are static, so build them once instead of per list_tools request
+TOOLS: List[Tool] = [
+    Tool(
+        name="search_canvas",
+        description="Search through vectorized Canvas course materials (lecture slides, PDFs, documents). Use this to find relevant information from your classes.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "The search query - describe what you're looking for"
                 },
-                "required": ["query"]
-            }
-        ),
-        Tool(
-            name="list_collections",
-            description="List all available vector collections",
-            inputSchema={
-                "type": "object",
-                "properties": {}
-            }
-        ),
-        Tool(
-            name="get_collection_info",
-            description="Get detailed information about a specific collection",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "collection": {
-                        "type": "string",
-                        "description": "Collection name"
-                    }
+                "num_results": {
+                    "type": "integer",
+                    "description": "Number of results to return (default: 5, max: 20)",
+                    "default": 5
                 },
-                "required": ["collection"]
-            }
-        ),
-        Tool(
-            name="get_file_content",
-            description="Get the full content of chunks from a specific file",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "filename": {
-                        "type": "string",
-                        "description": "The filename to retrieve chunks from"
-                    },
-                    "collection": {
-                        "type": "string",
-                        "description": "Collection name (default: canvas_materials)",
-                        "default": "canvas_materials"
-                    }
+                "collection": {
+                    "type": "string",
+                    "description": "Collection to search (default: canvas_materials)",
+                    "default": "canvas_materials"
+                }
+            },
+            "required": ["query"]
+        }
+    ),
+    Tool(
+        name="list_collections",
+        description="List all available vector collections",
+        inputSchema={
+            "type": "object",
+            "properties": {}
+        }
+    ),
+    Tool(
+        name="get_collection_info",
+        description="Get detailed information about a specific collection",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "collection": {
+                    "type": "string",
+                    "description": "Collection name"
+                }
+            },
+            "required": ["collection"]
+        }
+    ),
+    Tool(
+        name="get_file_content",
+        description="Get the full content of chunks from a specific file",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "filename": {
+                    "type": "string",
+                    "description": "The filename to retrieve chunks from"
                 },
-                "required": ["filename"]
-            }
-        ),
-        Tool(
-            name="get_course_files",
-            description="List all vectorized files from a specific course",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "course_name": {
-                        "type": "string",
-                        "description": "Part of the course name to filter by (e.g., 'EECE2310', 'Machine Learning')"
-                    },
-                    "collection": {
-                        "type": "string",
-                        "description": "Collection name (default: canvas_materials)",
-                        "default": "canvas_materials"
-                    }
+                "collection": {
+                    "type": "string",
+                    "description": "Collection name (default: canvas_materials)",
+                    "default": "canvas_materials"
+                }
+            },
+            "required": ["filename"]
+        }
+    ),
+    Tool(
+        name="get_course_files",
+        description="List all vectorized files from a specific course",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "course_name": {
+                    "type": "string",
+                    "description": "Part of the course name to filter by (e.g., 'EECE2310', 'Machine Learning')"
                 },
-                "required": ["course_name"]
-            }
-        ),
-        Tool(
-            name="get_stats",
-            description="Get statistics about the vector store",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "collection": {
-                        "type": "string",
-                        "description": "Collection name (optional, returns all if not specified)"
-                    }
+                "collection": {
+                    "type": "string",
+                    "description": "Collection name (default: canvas_materials)",
+                    "default": "canvas_materials"
+                }
+            },
+            "required": ["course_name"]
+        }
+    ),
+    Tool(
+        name="get_stats",
+        description="Get statistics about the vector store",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "collection": {
+                    "type": "string",
+                    "description": "Collection name (optional, returns all if not specified)"
                 }
             }
-        )
-    ]
+        }
+    )
+]
+
+
+@server.list_tools()
+async def list_tools() -> list[Tool]:
+    """Return available MCP tools."""
+    return TOOLS
 
 
 @server.call_tool()
 async def call_tool(name: str, arguments: dict) -> list[TextContent]:
     """Execute a tool and return results."""
-    import json
-
     try:
         if name == "search_canvas":
-            result = _search(
+            result = await _search(
                 query=arguments["query"],
                 num_results=arguments.get("num_results", 5),
                 collection=arguments.get("collection", config.default_collection)
@@ -179,33 +299,77 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
     except Exception as e:
         result = {"error": str(e)}
 
-    return [TextContent(type="text", text=json.dumps(result, indent=2))]
+    return [TextContent(type="text", text=orjson.dumps(result, option=orjson.OPT_INDENT_2).decode("utf-8"))]
 
 
+@lru_cache(maxsize=8192)
 def _extract_course_from_path(file_path: str) -> str:
     """Extract course name from file path."""
     if not file_path:
         return "Unknown"
     # File paths are like: canvas_downloads/COURSE_NAME_FOLDER/filename.pdf
-    parts = file_path.split("/")
-    for part in parts:
-        # Look for course folder (usually contains course code like EECE2310, DS4420, etc.)
-        if any(code in part.upper() for code in ["EECE", "DS44", "PHIL", "CS", "MATH"]):
-            # Clean up the folder name
-            return part.replace("_", " ")[:60]
+    match = _COURSE_RE.search(file_path)
+    if match:
+        # Clean up the folder name
+        return match.group(1).replace("_", " ")[:60]
     return "Unknown"
 
 
-def _search(query: str, num_results: int = 5, collection: str = "canvas_materials") -> dict:
+def _iter_metadatas(coll: chromadb.Collection, page_size: int = METADATA_PAGE_SIZE) -> Iterator[Dict[str, Any]]:
+    """Yield every chunk's metadata, fetching one page at a time."""
+    offset = 0
+    while True:
+        metadatas = coll.get(include=["metadatas"], limit=page_size, offset=offset)["metadatas"]
+        if not metadatas:
+            return
+        yield from metadatas
+        if len(metadatas) < page_size:
+            return
+        offset += page_size
+
+
+@lru_cache(maxsize=COLLECTION_INDEX_CACHE_SIZE)
+def _collection_index(name: str, count: int) -> Tuple[Tuple[Optional[str], str, str, int], ...]:
+    """
+    Summarize a collection's chunk metadata per source file.
+
+    Scanning every metadata row is the expensive part of the stats and
+    course-file tools, so the summary is cached and keyed by the chunk
+    count: adding or deleting chunks changes the key and forces a rescan.
+
+    Args:
+        name: Collection name
+        count: Current chunk count of the collection (only used as a cache key)
+
+    Returns:
+        (filename, file_path, course, chunk_count) per distinct file, in first-seen order
+    """
+    coll = _get_chroma_client().get_collection(name)
+
+    # Counter tallies in C and keeps first-seen order
+    chunk_counts = Counter(
+        (meta.get("filename"), meta.get("file_path", ""))
+        for meta in _iter_metadatas(coll)
+    )
+
+    return tuple(
+        (filename, file_path, _extract_course_from_path(file_path), chunk_count)
+        for (filename, file_path), chunk_count in chunk_counts.items()
+    )
+
+
+async def _search(query: str, num_results: int = 5, collection: str = "canvas_materials") -> dict:
     """Search the vector store."""
     num_results = min(num_results, config.max_results)
 
     # Determine embedding model from collection metadata
+    metadata = None
     try:
         collections = batch_service.list_collections(config.db_path)
         coll_info = next((c for c in collections if c["name"] == collection), None)
         if coll_info and coll_info.get("metadata"):
-            model = coll_info["metadata"].get("embedding_model", config.default_model)
+            metadata = coll_info["metadata"]
+            model = metadata.get("embedding_model", config.default_model)
         else:
             model = config.default_model
     except Exception:
@@ -213,11 +377,16 @@ def _search(query: str, num_results: int = 5, collection: str = "canvas_material
 
     batch_config = BatchConfig(
         embedding_model=model,
+        embedding_dimensions=batch_service.query_dimensions(model, metadata),
         collection_name=collection,
         persist_directory=config.db_path
     )
 
-    result = batch_service.query(query, batch_config, n_results=num_results)
+    # Embedding is shared with concurrent searches; Chroma runs off the event loop
+    query_embedding = await query_batcher.embed(query, batch_config)
+    result = await asyncio.to_thread(
+        batch_service.query, query, batch_config, num_results, query_embedding
+    )
 
     # Format results for model consumption
     formatted_results = []
@@ -278,13 +447,7 @@ def _get_collection_info(collection: str) -> dict:
 
 def _get_file_content(filename: str, collection: str) -> dict:
     """Get all chunks from a specific file."""
-    import chromadb
-    from chromadb.config import Settings
-
-    client = chromadb.PersistentClient(
-        path=config.db_path,
-        settings=Settings(anonymized_telemetry=False)
-    )
+    client = _get_chroma_client()
 
     try:
         coll = client.get_collection(collection)
@@ -298,27 +461,27 @@ def _get_file_content(filename: str, collection: str) -> dict:
     )
 
     if not results["ids"]:
-        # Try partial match
-        all_results = coll.get(include=["metadatas"])
+        # Try partial match against the cached per-file summary, not every chunk's metadata
+        needle = filename.lower()
         matching_files = [
-            m.get("filename") for m in all_results["metadatas"]
-            if filename.lower() in m.get("filename", "").lower()
+            name for name, _, _, _ in _collection_index(collection, coll.count())
+            if name and needle in name.lower()
         ]
         if matching_files:
             return {
-                "error": f"File not found. Did you mean: {list(set(matching_files))[:5]}"
+                "error": f"File not found. Did you mean: {list(dict.fromkeys(matching_files))[:5]}"
             }
         return {"error": f"File '{filename}' not found in collection"}
 
-    chunks = []
-    for i, doc in enumerate(results["documents"]):
-        chunks.append({
-            "chunk_index": results["metadatas"][i].get("chunk_index", i),
-            "content": doc
-        })
-
-    # Sort by chunk index
-    chunks.sort(key=lambda x: x["chunk_index"])
+    # Chroma returns a file's chunks in insertion order, so this sort is a
+    # single already-sorted run (linear) unless the file was partially re-added
+    chunks = sorted(
+        (
+            {"chunk_index": metadata.get("chunk_index", i), "content": doc}
+            for i, (doc, metadata) in enumerate(zip(results["documents"], results["metadatas"]))
+        ),
+        key=itemgetter("chunk_index")
+    )
 
     return {
         "filename": filename,
@@ -329,31 +492,23 @@ def _get_file_content(filename: str, collection: str) -> dict:
 
 def _get_course_files(course_name: str, collection: str) -> dict:
     """List files from a course by searching ChromaDB metadata."""
-    import chromadb
-    from chromadb.config import Settings
-
-    client = chromadb.PersistentClient(
-        path=config.db_path,
-        settings=Settings(anonymized_telemetry=False)
-    )
+    client = _get_chroma_client()
 
     try:
         coll = client.get_collection(collection)
     except Exception:
         return {"error": f"Collection '{collection}' not found"}
 
-    # Get all metadata to find files
-    all_results = coll.get(include=["metadatas"])
+    course_filter = course_name.lower()
 
-    # Group by filename and extract course from path
+    # Group by filename (per-file summary of all metadata, cached until the collection changes)
     files_info = {}
-    for meta in all_results["metadatas"]:
-        filename = meta.get("filename", "Unknown")
-        file_path = meta.get("file_path", "")
-        course = _extract_course_from_path(file_path)
+    for filename, file_path, course, chunk_count in _collection_index(collection, coll.count()):
+        if filename is None:
+            filename = "Unknown"
 
         # Filter by course name
-        if course_name.lower() not in course.lower() and course_name.lower() not in file_path.lower():
+        if course_filter not in course.lower() and course_filter not in file_path.lower():
             continue
 
         if filename not in files_info:
@@ -363,7 +518,7 @@ def _get_course_files(course_name: str, collection: str) -> dict:
                 "file_path": file_path,
                 "chunk_count": 0
             }
-        files_info[filename]["chunk_count"] += 1
+        files_info[filename]["chunk_count"] += chunk_count
 
     matching = list(files_info.values())
     matching.sort(key=lambda x: x["filename"])
@@ -384,13 +539,7 @@ def _get_course_files(course_name: str, collection: str) -> dict:
 
 def _get_stats(collection: Optional[str] = None) -> dict:
     """Get vector store statistics from ChromaDB."""
-    import chromadb
-    from chromadb.config import Settings
-
-    client = chromadb.PersistentClient(
-        path=config.db_path,
-        settings=Settings(anonymized_telemetry=False)
-    )
+    client = _get_chroma_client()
 
     collections_to_check = []
     if collection:
@@ -407,15 +556,11 @@ def _get_stats(collection: Optional[str] = None) -> dict:
     courses = set()
 
     for coll in collections_to_check:
-        total_chunks += coll.count()
-        # Sample metadata to get file/course info
-        results = coll.get(include=["metadatas"])
-        for meta in results["metadatas"]:
-            filename = meta.get("filename")
-            file_path = meta.get("file_path", "")
+        count = coll.count()
+        total_chunks += count
+        for filename, _, course, _ in _collection_index(coll.name, count):
             if filename:
                 total_files.add(filename)
-            course = _extract_course_from_path(file_path)
             if course != "Unknown":
                 courses.add(course)
 
@@ -437,6 +582,46 @@ async def main():
         )
 
 
+async def main_sse(host: str = SSE_HOST, port: int = SSE_PORT):
+    """
+    Run the MCP server over HTTP (SSE transport) as a long-lived process.
+
+    All client sessions share this process, so the ChromaDB client, embedding
+    model and query/collection caches stay warm between sessions.
+    """
+    import uvicorn
+    from mcp.server.sse import SseServerTransport
+    from starlette.applications import Starlette
+    from starlette.responses import Response
+    from starlette.routing import Mount, Route
+
+    sse = SseServerTransport("/messages/")
+
+    async def handle_sse(request):
+        async with sse.connect_sse(request.scope, request.receive, request._send) as (read_stream, write_stream):
+            await server.run(
+                read_stream,
+                write_stream,
+                server.create_initialization_options()
+            )
+        return Response()
+
+    app = Starlette(routes=[
+        Route("/sse", endpoint=handle_sse, methods=["GET"]),
+        Mount("/messages/", app=sse.handle_post_message),
+    ])
+
+    await uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning")).serve()
+
+
 if __name__ == "__main__":
-    import asyncio
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="MCP server for the Canvas vector store")
+    parser.add_argument("--transport", choices=["stdio", "sse"], default="stdio")
+    parser.add_argument("--host", default=SSE_HOST, help="Bind address for --transport sse")
+    parser.add_argument("--port", type=int, default=SSE_PORT, help="Port for --transport sse")
+    args = parser.parse_args()
+
+    if args.transport == "sse":
+        asyncio.run(main_sse(args.host, args.port))
+    else:
+        asyncio.run(main())
@@ -1,10 +1,15 @@
 """Assignments API router."""
 
-from typing import List, Optional
-from fastapi import APIRouter, HTTPException, Request
+import asyncio
+import base64
+import binascii
+import hashlib
+import json
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
-from services.database_service import DatabaseService
 from services.assignment_service import AssignmentService
 from services.generation_service import GenerationService
 
@@ -85,82 +90,165 @@ class GenerationResultResponse(BaseModel):
 
 
 # Helper functions
-def _get_db(request: Request) -> DatabaseService:
-    settings = request.app.state.settings
-    return DatabaseService(db_path=getattr(settings, 'db_path', './data/canvas_tracker.db'))
+# Services are built once at startup (see main.lifespan) and shared by every request
+def _get_assignment_service(request: Request) -> AssignmentService:
+    return request.app.state.assignment_service
 
 
-def _get_assignment_service(request: Request) -> AssignmentService:
-    settings = request.app.state.settings
-    db = _get_db(request)
-    return AssignmentService(
-        db=db,
-        canvas_api_url=settings.canvas_api_url,
-        canvas_api_token=settings.canvas_api_token,
-        openai_api_key=settings.openai_api_key,
-        chroma_persist_dir=getattr(settings, 'chroma_persist_dir', './canvas_chroma_db')
+def _get_generation_service(request: Request) -> GenerationService:
+    return request.app.state.generation_service
+
+
+def _etag(*parts: Any) -> str:
+    """Build an ETag from the fields that determine a response's content."""
+    return '"' + hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=8).hexdigest() + '"'
+
+
+def _assignment_version(assignment: dict) -> tuple:
+    """Fields that change whenever an assignment is re-synced or regenerated."""
+    return (
+        assignment["id"],
+        assignment.get("last_synced_at"),
+        assignment.get("chunks_generated"),
+        assignment.get("study_guide_generated")
     )
 
 
-def _get_generation_service(request: Request) -> GenerationService:
-    settings = request.app.state.settings
-    db = _get_db(request)
-    assignment_service = _get_assignment_service(request)
-    return GenerationService(
-        db=db,
-        assignment_service=assignment_service,
-        openai_api_key=settings.openai_api_key
+def _encode_cursor(assignment: dict) -> str:
+    """Opaque page cursor pointing just past `assignment` in (due_at, id) order."""
+    raw = json.dumps([assignment.get("due_at"), assignment["id"]]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> Tuple[Optional[str], int]:
+    """Inverse of _encode_cursor; raises 400 for anything malformed."""
+    try:
+        due_at, assignment_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        if (due_at is not None and not isinstance(due_at, str)) or not isinstance(assignment_id, int):
+            raise ValueError("bad cursor fields")
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return due_at, assignment_id
+
+
+def _sse(events: Iterator[Dict[str, Any]]) -> Iterator[str]:
+    """Frame generation events as server-sent events, reporting failures in-band."""
+    try:
+        for event in events:
+            yield f"data: {json.dumps(event)}\n\n"
+    except Exception as e:
+        # Headers are already sent, so the status code can't change any more
+        yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+
+
+async def _stream_generation(generate_stream, assignment_id: int, model: Optional[str], max_context_tokens: int):
+    """Run retrieval off the event loop, then stream the completion as SSE."""
+    try:
+        events = await asyncio.to_thread(
+            generate_stream,
+            assignment_id=assignment_id,
+            model=model,
+            max_context_tokens=max_context_tokens,
+            save_to_db=True
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    # Sync iterators are consumed in Starlette's threadpool, one token at a time
+    return StreamingResponse(
+        _sse(events),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
 
+def _check_etag(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """
+    Tag a response for revalidation, or short-circuit it if the client is current.
+
+    Returns:
+        A 304 response if If-None-Match matches `etag`, else None (headers are set on `response`)
+    """
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return None
+
+
 # Endpoints
+# Read-only endpoints are plain `def` so FastAPI runs their blocking SQLite
+# work in its threadpool; Canvas/OpenAI calls are awaited via asyncio.to_thread.
 @router.get("/", response_model=List[AssignmentResponse])
-async def list_assignments(
+def list_assignments(
     request: Request,
+    response: Response,
+    service: AssignmentService = Depends(_get_assignment_service),
     course_id: Optional[int] = None,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-    limit: int = 100
+    limit: int = 100,
+    cursor: Optional[str] = None
 ):
-    """List assignments with optional filters."""
+    """
+    List assignments with optional filters.
+
+    Results are paged by (due_at, id). When a page is full, the URL of the
+    next page is sent in a `Link: <...>; rel="next"` header.
+    """
+    after = _decode_cursor(cursor) if cursor else None
     try:
-        service = _get_assignment_service(request)
         assignments = service.get_assignments(
             course_id=course_id,
             start_date=start_date,
             end_date=end_date,
-            limit=limit
+            limit=limit,
+            after=after
         )
-        return assignments
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    if assignments and len(assignments) == limit:
+        next_url = request.url.include_query_params(cursor=_encode_cursor(assignments[-1]))
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+    return assignments
+
 
 @router.get("/upcoming", response_model=List[AssignmentResponse])
-async def get_upcoming_assignments(
+def get_upcoming_assignments(
     request: Request,
+    response: Response,
+    service: AssignmentService = Depends(_get_assignment_service),
     days: int = 7
 ):
     """Get assignments due in the next N days."""
     try:
-        service = _get_assignment_service(request)
-        return service.get_upcoming_assignments(days=days)
+        assignments = service.get_upcoming_assignments(days=days)
+
+        etag = _etag(days, [_assignment_version(a) for a in assignments])
+        return _check_etag(request, response, etag) or assignments
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/{assignment_id}", response_model=AssignmentResponse)
-async def get_assignment(
+def get_assignment(
     request: Request,
-    assignment_id: int
+    response: Response,
+    assignment_id: int,
+    service: AssignmentService = Depends(_get_assignment_service)
 ):
     """Get a single assignment by ID."""
     try:
-        service = _get_assignment_service(request)
         assignment = service.get_assignment(assignment_id)
         if not assignment:
             raise HTTPException(status_code=404, detail="Assignment not found")
-        return assignment
+        return _check_etag(request, response, _etag(_assignment_version(assignment))) or assignment
     except HTTPException:
         raise
     except Exception as e:
@@ -169,15 +257,15 @@ async def get_assignment(
 
 @router.post("/sync", response_model=SyncResponse)
 async def sync_assignments(
-    request: Request,
+    service: AssignmentService = Depends(_get_assignment_service),
     sync_request: Optional[SyncRequest] = None
 ):
     """Sync assignments from Canvas (favorited courses only by default)."""
     try:
-        service = _get_assignment_service(request)
         course_ids = sync_request.course_ids if sync_request else None
         favorites_only = sync_request.favorites_only if sync_request else True
-        result = service.sync_assignments(
+        result = await asyncio.to_thread(
+            service.sync_assignments,
             course_ids=course_ids,
             favorites_only=favorites_only
         )
@@ -193,14 +281,23 @@ async def sync_assignments(
 
 
 @router.get("/{assignment_id}/chunks", response_model=List[ChunkResponse])
-async def get_assignment_chunks(
+def get_assignment_chunks(
     request: Request,
-    assignment_id: int
+    response: Response,
+    assignment_id: int,
+    service: AssignmentService = Depends(_get_assignment_service)
 ):
     """Get relevant knowledge chunks for an assignment."""
     try:
-        service = _get_assignment_service(request)
-        chunks = service.get_cached_chunks(assignment_id)
+        # The cached chunk rows are rewritten on every re-process, so they version
+        # the response; a match skips the ChromaDB lookup entirely
+        cached = service.db.get_assignment_chunks(assignment_id)
+        etag = _etag(assignment_id, [(c["chunk_id"], c["relevance_score"], c["created_at"]) for c in cached])
+        not_modified = _check_etag(request, response, etag)
+        if not_modified:
+            return not_modified
+
+        chunks = service.get_cached_chunks(assignment_id, cached=cached)
         return [
             ChunkResponse(
                 chunk_id=c.chunk_id,
@@ -217,16 +314,16 @@ async def get_assignment_chunks(
 
 @router.post("/{assignment_id}/process", response_model=List[ChunkResponse])
 async def process_assignment_chunks(
-    request: Request,
     assignment_id: int,
+    service: AssignmentService = Depends(_get_assignment_service),
     process_request: ProcessChunksRequest = None
 ):
     """Find and cache relevant chunks for an assignment."""
     try:
-        service = _get_assignment_service(request)
         req = process_request or ProcessChunksRequest()
 
-        chunks = service.find_relevant_chunks(
+        chunks = await asyncio.to_thread(
+            service.find_relevant_chunks,
             assignment_id=assignment_id,
             collection_name=req.collection_name,
             embedding_model=req.embedding_model,
@@ -251,17 +348,18 @@ async def process_assignment_chunks(
 
 
 @router.get("/{assignment_id}/study-guide")
-async def get_study_guide(
+def get_study_guide(
     request: Request,
-    assignment_id: int
+    response: Response,
+    assignment_id: int,
+    service: GenerationService = Depends(_get_generation_service)
 ):
     """Get cached study guide for an assignment."""
     try:
-        service = _get_generation_service(request)
         content = service.get_study_guide(assignment_id)
         if not content:
             raise HTTPException(status_code=404, detail="No study guide found")
-        return content
+        return _check_etag(request, response, _etag(content["id"], content["created_at"])) or content
     except HTTPException:
         raise
     except Exception as e:
@@ -270,16 +368,16 @@ async def get_study_guide(
 
 @router.post("/{assignment_id}/study-guide/generate", response_model=GenerationResultResponse)
 async def generate_study_guide(
-    request: Request,
     assignment_id: int,
+    service: GenerationService = Depends(_get_generation_service),
     generate_request: GenerateRequest = None
 ):
     """Generate a new study guide for an assignment."""
     try:
-        service = _get_generation_service(request)
         req = generate_request or GenerateRequest()
 
-        result = service.generate_study_guide(
+        result = await asyncio.to_thread(
+            service.generate_study_guide,
             assignment_id=assignment_id,
             model=req.model,
             max_context_tokens=req.max_context_tokens,
@@ -298,18 +396,38 @@ async def generate_study_guide(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/{assignment_id}/study-guide/stream")
+async def stream_study_guide(
+    assignment_id: int,
+    service: GenerationService = Depends(_get_generation_service),
+    model: Optional[str] = None,
+    max_context_tokens: int = Query(default=8000, ge=1000, le=32000)
+):
+    """
+    Generate a new study guide, streaming it as server-sent events.
+
+    Each `data:` event is `{"delta": "..."}`; the last is
+    `{"done": true, "citations": [...], "model_used": "..."}`, sent after the
+    guide has been saved.
+    """
+    return await _stream_generation(
+        service.generate_study_guide_stream, assignment_id, model, max_context_tokens
+    )
+
+
 @router.get("/{assignment_id}/solution")
-async def get_solution(
+def get_solution(
     request: Request,
-    assignment_id: int
+    response: Response,
+    assignment_id: int,
+    service: GenerationService = Depends(_get_generation_service)
 ):
     """Get cached solution for an assignment (nuclear option)."""
     try:
-        service = _get_generation_service(request)
         content = service.get_solution(assignment_id)
         if not content:
             raise HTTPException(status_code=404, detail="No solution found")
-        return content
+        return _check_etag(request, response, _etag(content["id"], content["created_at"])) or content
     except HTTPException:
         raise
     except Exception as e:
@@ -318,8 +436,8 @@ async def get_solution(
 
 @router.post("/{assignment_id}/solution/generate", response_model=GenerationResultResponse)
 async def generate_solution(
-    request: Request,
     assignment_id: int,
+    service: GenerationService = Depends(_get_generation_service),
     generate_request: GenerateRequest = None
 ):
     """
@@ -328,10 +446,10 @@ async def generate_solution(
     WARNING: This generates complete solutions. Use responsibly.
     """
     try:
-        service = _get_generation_service(request)
         req = generate_request or GenerateRequest()
 
-        result = service.generate_solution(
+        result = await asyncio.to_thread(
+            service.generate_solution,
             assignment_id=assignment_id,
             model=req.model,
             max_context_tokens=req.max_context_tokens,
@@ -348,3 +466,16 @@ async def generate_solution(
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{assignment_id}/solution/stream")
+async def stream_solution(
+    assignment_id: int,
+    service: GenerationService = Depends(_get_generation_service),
+    model: Optional[str] = None,
+    max_context_tokens: int = Query(default=8000, ge=1000, le=32000)
+):
+    """Generate a solution attempt, streaming it as server-sent events (see stream_study_guide)."""
+    return await _stream_generation(
+        service.generate_solution_stream, assignment_id, model, max_context_tokens
+    )
@@ -1,7 +1,10 @@
 """Batch processing API endpoints."""
 
+import asyncio
 import os
-from typing import List, Optional
+import shutil
+import tempfile
+from typing import List, Optional, Tuple
 from pathlib import Path
 
 from fastapi import APIRouter, HTTPException, UploadFile, File, Request, BackgroundTasks
@@ -68,9 +71,8 @@ class BatchResultResponse(BaseModel):
 
 
 def _get_service(request: Request) -> BatchService:
-    """Get batch service with API key from settings."""
-    settings = request.app.state.settings
-    return BatchService(openai_api_key=settings.openai_api_key)
+    """Get the batch service shared by every request (see main.lifespan)."""
+    return request.app.state.batch_service
 
 
 def _config_to_batch(config: BatchConfigRequest) -> BatchConfig:
@@ -111,6 +113,9 @@ def _result_to_response(result: BatchResult) -> BatchResultResponse:
     )
 
 
+# Endpoints
+# Quick Chroma reads/writes are plain `def` so FastAPI runs them in its threadpool;
+# ingestion is awaited via asyncio.to_thread so it never blocks the event loop.
 @router.post("/process/files", response_model=BatchResultResponse)
 async def process_files(request: ProcessFilesRequest, req: Request):
     """
@@ -122,12 +127,14 @@ async def process_files(request: ProcessFilesRequest, req: Request):
     config = _config_to_batch(request.config)
 
     # Validate all files exist
-    for path in request.file_paths:
-        if not os.path.isfile(path):
-            raise HTTPException(status_code=400, detail=f"File not found: {path}")
+    missing = await asyncio.to_thread(
+        lambda: [path for path in request.file_paths if not os.path.isfile(path)]
+    )
+    if missing:
+        raise HTTPException(status_code=400, detail=f"File not found: {missing[0]}")
 
     try:
-        result = service.process_files(request.file_paths, config)
+        result = await asyncio.to_thread(service.process_files, request.file_paths, config)
         return _result_to_response(result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
@@ -143,11 +150,12 @@ async def process_directory(request: ProcessDirectoryRequest, req: Request):
     service = _get_service(req)
     config = _config_to_batch(request.config)
 
-    if not os.path.isdir(request.directory):
+    if not await asyncio.to_thread(os.path.isdir, request.directory):
         raise HTTPException(status_code=400, detail=f"Directory not found: {request.directory}")
 
     try:
-        result = service.process_directory(
+        result = await asyncio.to_thread(
+            service.process_directory,
             request.directory,
             config,
             recursive=request.recursive
@@ -157,6 +165,17 @@ async def process_directory(request: ProcessDirectoryRequest, req: Request):
         raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
 
 
+def _save_upload(file: UploadFile) -> Tuple[str, Optional[str]]:
+    """Copy an upload to a temp file (keeping its extension) and return (path, original name)."""
+    # Create temp file with original extension
+    suffix = Path(file.filename).suffix if file.filename else ".txt"
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+        # Stream from the spooled upload instead of reading it all into memory
+        file.file.seek(0)
+        shutil.copyfileobj(file.file, tmp)
+        return tmp.name, file.filename
+
+
 @router.post("/process/upload", response_model=BatchResultResponse)
 async def process_uploaded_files(
     req: Request,
@@ -173,8 +192,6 @@ async def process_uploaded_files(
 
     This endpoint accepts file uploads and processes them immediately.
     """
-    import tempfile
-
     service = _get_service(req)
     config = BatchConfig(
         chunking_strategy=chunking_strategy,
@@ -188,30 +205,24 @@ async def process_uploaded_files(
     # Save uploaded files to temp directory
     temp_paths = []
     try:
-        for file in files:
-            # Create temp file with original extension
-            suffix = Path(file.filename).suffix if file.filename else ".txt"
-            with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-                content = await file.read()
-                tmp.write(content)
-                temp_paths.append((tmp.name, file.filename))
-
-        # Process files
+        # Copy all uploads to disk concurrently, off the event loop
+        saved = await asyncio.gather(
+            *(asyncio.to_thread(_save_upload, file) for file in files),
+            return_exceptions=True
+        )
+        temp_paths = [item for item in saved if not isinstance(item, BaseException)]
+        for item in saved:
+            if isinstance(item, BaseException):
+                raise item
+
+        # Process files (parsing, embedding and Chroma writes block, so use a worker thread)
         file_paths = [path for path, _ in temp_paths]
-        result = service.process_files(file_paths, config)
+        result = await asyncio.to_thread(service.process_files, file_paths, config)
 
-        # Update filenames in results to original names
-        filename_map = {path: name for path, name in temp_paths}
+        # Results are named after the temp files; map them back to the uploaded names
+        original_names = {os.path.basename(path): name for path, name in temp_paths}
         for r in result.results:
-            original = filename_map.get(
-                next((p for p, n in temp_paths if n == r.filename or p.endswith(r.filename)), None),
-                r.filename
-            )
-            # Try to restore original filename
-            for path, name in temp_paths:
-                if path.endswith(r.filename) or r.filename == os.path.basename(path):
-                    r.filename = name
-                    break
+            r.filename = original_names.get(os.path.basename(r.filename)) or r.filename
 
         return _result_to_response(result)
 
@@ -225,7 +236,7 @@ async def process_uploaded_files(
 
 
 @router.post("/query")
-async def query_database(request: QueryRequest, req: Request):
+def query_database(request: QueryRequest, req: Request):
     """
     Query the vector database for similar documents.
 
@@ -241,7 +252,7 @@ async def query_database(request: QueryRequest, req: Request):
 
 
 @router.get("/collections")
-async def list_collections(req: Request, persist_directory: str = "./chroma_db"):
+def list_collections(req: Request, persist_directory: str = "./chroma_db"):
     """List all collections in the database."""
     service = _get_service(req)
 
@@ -252,7 +263,7 @@ async def list_collections(req: Request, persist_directory: str = "./chroma_db")
 
 
 @router.get("/collections/{collection_name}")
-async def get_collection_info(
+def get_collection_info(
     collection_name: str,
     req: Request,
     persist_directory: str = "./chroma_db"
@@ -272,7 +283,7 @@ async def get_collection_info(
 
 
 @router.delete("/collections/{collection_name}")
-async def delete_collection(
+def delete_collection(
     collection_name: str,
     req: Request,
     persist_directory: str = "./chroma_db"
@@ -301,7 +312,7 @@ async def get_supported_formats():
 
 
 @router.post("/export/{collection_name}")
-async def export_collection(
+def export_collection(
     collection_name: str,
     req: Request,
     persist_directory: str = "./chroma_db"
@@ -321,7 +332,7 @@ async def export_collection(
 
 
 @router.post("/import/{collection_name}")
-async def import_collection(
+def import_collection(
     collection_name: str,
     req: Request,
     data: dict,
@@ -1,5 +1,6 @@
 """Calendar API router."""
 
+import asyncio
 from typing import List, Optional
 from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel, Field
@@ -108,8 +109,10 @@ def _event_to_response(event) -> dict:
 
 
 # Endpoints
+# Read-only endpoints are plain `def` so FastAPI runs their blocking SQLite
+# work in its threadpool; the Canvas sync is awaited via asyncio.to_thread.
 @router.get("/events", response_model=List[CalendarEventResponse])
-async def get_events(
+def get_events(
     request: Request,
     start_date: str,
     end_date: str,
@@ -138,7 +141,7 @@ async def get_events(
 
 
 @router.get("/month/{year}/{month}", response_model=MonthViewResponse)
-async def get_month_view(
+def get_month_view(
     request: Request,
     year: int,
     month: int,
@@ -172,7 +175,7 @@ async def get_month_view(
 
 
 @router.get("/week", response_model=WeekViewResponse)
-async def get_week_view(
+def get_week_view(
     request: Request,
     date: Optional[str] = None,
     include_assignments: bool = True,
@@ -199,7 +202,7 @@ async def get_week_view(
 
 
 @router.get("/day/{date}", response_model=List[CalendarEventResponse])
-async def get_day_events(
+def get_day_events(
     request: Request,
     date: str,
     include_assignments: bool = True,
@@ -226,7 +229,7 @@ async def get_day_events(
 
 
 @router.get("/upcoming", response_model=List[CalendarEventResponse])
-async def get_upcoming_events(
+def get_upcoming_events(
     request: Request,
     days: int = 7,
     include_assignments: bool = True,
@@ -261,7 +264,8 @@ async def sync_calendar_events(
     try:
         service = _get_calendar_service(request)
 
-        result = service.sync_calendar_events(
+        result = await asyncio.to_thread(
+            service.sync_calendar_events,
             start_date=sync_request.start_date,
             end_date=sync_request.end_date,
             context_codes=sync_request.context_codes
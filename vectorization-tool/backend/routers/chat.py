@@ -1,10 +1,12 @@
 """Chat API endpoint for portfolio assistant with security guardrails."""
 
 import re
+import threading
 import time
 import hashlib
-from typing import List, Dict, Any, Optional
-from collections import defaultdict
+from functools import lru_cache
+from typing import List, Deque, Dict, Any, Optional, Tuple
+from collections import OrderedDict, deque
 from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel, Field, field_validator
 from openai import OpenAI
@@ -12,6 +14,7 @@ import chromadb
 from chromadb.config import Settings as ChromaSettings
 
 from config import get_settings
+from services.batch_service import distance_to_similarity
 
 
 router = APIRouter()
@@ -21,22 +24,44 @@ router = APIRouter()
 # Rate Limiting
 # =============================================================================
 
+# Requests allowed per IP per minute / per hour
+RATE_LIMIT_PER_MINUTE = 10
+RATE_LIMIT_PER_HOUR = 50
+
+# Tracked IPs before idle entries are swept out
+RATE_LIMIT_SWEEP_THRESHOLD = 10_000
+
+
 class RateLimiter:
     """Simple in-memory rate limiter per IP."""
 
     def __init__(self):
-        self.requests: Dict[str, List[float]] = defaultdict(list)
+        # Timestamps of each IP's requests in the last hour, oldest first. Nothing is
+        # recorded past the hourly limit, so each buffer holds at most that many.
+        self.requests: Dict[str, Deque[float]] = {}
         self.blocked_until: Dict[str, float] = {}
 
-    def _clean_old_requests(self, ip: str, window_seconds: int):
-        """Remove requests outside the time window."""
-        cutoff = time.time() - window_seconds
-        self.requests[ip] = [t for t in self.requests[ip] if t > cutoff]
+    def _clean_old_requests(self, timestamps: Deque[float], window_seconds: int):
+        """Drop requests outside the time window from the front of the buffer."""
+        cutoff = time.monotonic() - window_seconds
+        while timestamps and timestamps[0] <= cutoff:
+            timestamps.popleft()
+
+    def _sweep(self, now: float):
+        """Forget IPs with no requests in the last hour and expired blocks."""
+        cutoff = now - 3600
+        self.requests = {
+            ip: timestamps for ip, timestamps in self.requests.items()
+            if timestamps and timestamps[-1] > cutoff
+        }
+        self.blocked_until = {
+            ip: until for ip, until in self.blocked_until.items() if until > now
+        }
 
     def is_blocked(self, ip: str) -> bool:
         """Check if IP is temporarily blocked."""
         if ip in self.blocked_until:
-            if time.time() < self.blocked_until[ip]:
+            if time.monotonic() < self.blocked_until[ip]:
                 return True
             del self.blocked_until[ip]
         return False
@@ -49,25 +74,36 @@ class RateLimiter:
         if self.is_blocked(ip):
             return False, "Too many requests. Please wait a few minutes."
 
-        now = time.time()
+        now = time.monotonic()
 
-        # Clean old requests
-        self._clean_old_requests(ip, 3600)  # 1 hour window
-
-        # Check limits
-        minute_requests = sum(1 for t in self.requests[ip] if t > now - 60)
-        hour_requests = len(self.requests[ip])
+        timestamps = self.requests.get(ip)
+        if timestamps is None:
+            if len(self.requests) >= RATE_LIMIT_SWEEP_THRESHOLD:
+                self._sweep(now)
+            timestamps = self.requests[ip] = deque(maxlen=RATE_LIMIT_PER_HOUR)
 
-        if minute_requests >= 10:
+        # Clean old requests
+        self._clean_old_requests(timestamps, 3600)  # 1 hour window
+
+        # Check limits (newest first; stops once past the last minute)
+        minute_cutoff = now - 60
+        minute_requests = 0
+        for t in reversed(timestamps):
+            if t <= minute_cutoff:
+                break
+            minute_requests += 1
+        hour_requests = len(timestamps)
+
+        if minute_requests >= RATE_LIMIT_PER_MINUTE:
             self.blocked_until[ip] = now + 60  # Block for 1 minute
             return False, "Rate limit exceeded. Please wait a minute before trying again."
 
-        if hour_requests >= 50:
+        if hour_requests >= RATE_LIMIT_PER_HOUR:
             self.blocked_until[ip] = now + 300  # Block for 5 minutes
             return False, "Hourly limit exceeded. Please try again later."
 
         # Record request
-        self.requests[ip].append(now)
+        timestamps.append(now)
         return True, ""
 
 
@@ -116,7 +152,16 @@ INJECTION_PATTERNS = [
     r"</?(system|instruction|context)>",
 ]
 
-COMPILED_PATTERNS = [re.compile(p, re.IGNORECASE) for p in INJECTION_PATTERNS]
+# All patterns as one alternation, so a message is scanned once rather than once per
+# pattern. Each is wrapped in a named group so a match reports which pattern fired.
+INJECTION_RE = re.compile(
+    "|".join(f"(?P<p{i}>{pattern})" for i, pattern in enumerate(INJECTION_PATTERNS)),
+    re.IGNORECASE
+)
+
+# Characters common in encoding/markup attacks, and long single-character runs
+SPECIAL_CHARS_RE = re.compile(r'[<>\[\]{}|\\`]')
+REPEATED_CHARS_RE = re.compile(r'(.)\1{20,}')
 
 
 def detect_injection(text: str) -> tuple[bool, str]:
@@ -124,38 +169,50 @@ def detect_injection(text: str) -> tuple[bool, str]:
     Detect potential prompt injection attempts.
     Returns (is_suspicious, matched_pattern).
     """
-    text_lower = text.lower()
-
-    # Check compiled patterns
-    for pattern in COMPILED_PATTERNS:
-        if pattern.search(text_lower):
-            return True, pattern.pattern
+    # Check all injection patterns in a single pass
+    match = INJECTION_RE.search(text)
+    if match:
+        return True, INJECTION_PATTERNS[int(match.lastgroup[1:])]
 
     # Check for excessive special characters (potential encoding attacks)
-    special_char_ratio = len(re.findall(r'[<>\[\]{}|\\`]', text)) / max(len(text), 1)
+    special_char_ratio = len(SPECIAL_CHARS_RE.findall(text)) / max(len(text), 1)
     if special_char_ratio > 0.15:
         return True, "excessive_special_chars"
 
     # Check for very long repeated sequences (potential buffer attacks)
-    if re.search(r'(.)\1{20,}', text):
+    if REPEATED_CHARS_RE.search(text):
         return True, "repeated_chars"
 
     return False, ""
 
 
+# Control characters to delete (tab, newline and carriage return are kept as whitespace)
+CONTROL_CHARS_TABLE = dict.fromkeys(
+    [*range(0x00, 0x09), 0x0b, 0x0c, *range(0x0e, 0x20), 0x7f]
+)
+
+# Fenced code blocks and HTML tags, stripped in one pass
+MARKUP_RE = re.compile(r'(```[^`]*```)|<[^>]+>')
+
+
+# Sanitized strings remembered; the frontend resends the same history every turn
+SANITIZE_CACHE_SIZE = 1024
+
+# Raw history entries are cut to this length before sanitizing (bounds cache keys)
+MAX_RAW_HISTORY_CHARS = 2000
+
+
+@lru_cache(maxsize=SANITIZE_CACHE_SIZE)
 def sanitize_input(text: str) -> str:
     """Sanitize user input by removing potentially dangerous patterns."""
     # Remove control characters
-    text = re.sub(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]', '', text)
-
-    # Normalize whitespace
-    text = re.sub(r'\s+', ' ', text).strip()
+    text = text.translate(CONTROL_CHARS_TABLE)
 
     # Remove markdown/HTML that could confuse the model
-    text = re.sub(r'```[^`]*```', '[code block removed]', text)
-    text = re.sub(r'<[^>]+>', '', text)
+    text = MARKUP_RE.sub(lambda m: '[code block removed]' if m.group(1) else '', text)
 
-    return text
+    # Normalize whitespace
+    return ' '.join(text.split())
 
 
 # =============================================================================
@@ -198,19 +255,22 @@ OFF_TOPIC_INDICATORS = [
     "write fiction", "roleplay scenario",
 ]
 
+# Plain-substring match on any indicator, as one case-insensitive scan of the message
+OFF_TOPIC_RE = re.compile("|".join(map(re.escape, OFF_TOPIC_INDICATORS)), re.IGNORECASE)
+
+# Average cosine similarity of retrieved context below which a question is off-topic
+# (the old l2 cutoff: squared distance 1.5 = 2 - 2cos)
+MIN_CONTEXT_SIMILARITY = 0.25
 
-def is_off_topic(message: str, context_relevance: float) -> bool:
-    """Check if message is likely off-topic."""
-    message_lower = message.lower()
 
+def is_off_topic(message: str, context_relevance: float) -> bool:
+    """Check if message is likely off-topic (context_relevance is average cosine similarity)."""
     # Check for off-topic indicators
-    for indicator in OFF_TOPIC_INDICATORS:
-        if indicator in message_lower:
-            return True
+    if OFF_TOPIC_RE.search(message):
+        return True
 
     # If retrieved context has very low relevance, likely off-topic
-    # (distance > 1.5 in cosine space means very dissimilar)
-    if context_relevance > 1.5:
+    if context_relevance < MIN_CONTEXT_SIMILARITY:
         return True
 
     return False
@@ -245,7 +305,7 @@ class ChatRequest(BaseModel):
             if isinstance(msg, dict) and 'role' in msg and 'content' in msg:
                 sanitized.append({
                     'role': msg['role'][:10],  # 'user' or 'assistant'
-                    'content': sanitize_input(str(msg['content']))[:500]
+                    'content': sanitize_input(str(msg['content'])[:MAX_RAW_HISTORY_CHARS])[:500]
                 })
         return sanitized
 
@@ -260,25 +320,70 @@ class ChatResponse(BaseModel):
 # Vector Database Functions
 # =============================================================================
 
-def get_vector_client():
-    """Get ChromaDB client for the documents collection."""
-    # Use the same path as the batch endpoint (./chroma_db)
-    # This is where the upload API stores vectors
-    client = chromadb.PersistentClient(
-        path="./chroma_db",
-        settings=ChromaSettings(anonymized_telemetry=False)
-    )
-    return client
+# ChromaDB client and "documents" collection, opened once and shared by every chat request
+_vector_client: Optional[chromadb.ClientAPI] = None
+_vector_collection: Optional[chromadb.Collection] = None
+_vector_lock = threading.Lock()
+# Separate from _vector_lock, which get_vector_client takes while this one is held
+_collection_lock = threading.Lock()
+
+
+def get_vector_client() -> chromadb.ClientAPI:
+    """Get the shared ChromaDB client for the documents collection."""
+    global _vector_client
+    with _vector_lock:
+        if _vector_client is None:
+            # Use the same path as the batch endpoint (./chroma_db)
+            # This is where the upload API stores vectors
+            _vector_client = chromadb.PersistentClient(
+                path="./chroma_db",
+                settings=ChromaSettings(anonymized_telemetry=False)
+            )
+        return _vector_client
+
+
+def get_vector_collection() -> chromadb.Collection:
+    """Get the shared "documents" collection handle (raises if it doesn't exist yet)."""
+    global _vector_collection
+    with _collection_lock:
+        if _vector_collection is None:
+            _vector_collection = get_vector_client().get_collection("documents")
+        return _vector_collection
+
+
+# Retrieval results kept for repeated questions, and how long they stay valid (seconds)
+QUERY_CACHE_SIZE = 512
+QUERY_CACHE_TTL = 3600.0
+
+# (question, n_results, collection count) -> (stored_at, chunks, avg_similarity)
+_query_cache: "OrderedDict[Tuple[str, int, int], Tuple[float, List[Dict[str, Any]], float]]" = OrderedDict()
+_query_cache_lock = threading.Lock()
 
 
 def query_vectors(query_text: str, n_results: int = 5) -> tuple[List[Dict[str, Any]], float]:
     """
     Query the vector database for relevant chunks.
-    Returns (chunks, avg_distance).
+    Returns (chunks, avg_similarity), where similarity is cosine similarity
+    whatever distance metric the collection was created with.
+
+    Portfolio visitors ask the same few questions, so results are cached per
+    normalized question. The collection's chunk count is part of the key, so
+    uploading or deleting documents invalidates earlier results.
     """
+    global _vector_collection
+    collection = None
     try:
-        client = get_vector_client()
-        collection = client.get_collection("documents")
+        collection = get_vector_collection()
+
+        use_cache = get_settings().chat_query_cache
+        if use_cache:
+            key = (query_text.strip().lower(), n_results, collection.count())
+            now = time.monotonic()
+            with _query_cache_lock:
+                cached = _query_cache.get(key)
+                if cached is not None and now - cached[0] < QUERY_CACHE_TTL:
+                    _query_cache.move_to_end(key)
+                    return cached[1], cached[2]
 
         results = collection.query(
             query_texts=[query_text],
@@ -286,24 +391,42 @@ def query_vectors(query_text: str, n_results: int = 5) -> tuple[List[Dict[str, A
             include=["documents", "metadatas", "distances"]
         )
 
+        # Older collections use Chroma's default l2, batch-created ones use ip
+        space = (collection.metadata or {}).get("hnsw:space", "l2")
+
         chunks = []
-        distances = []
+        similarities = []
         if results and results.get("documents") and results["documents"][0]:
             for i, doc in enumerate(results["documents"][0]):
                 metadata = results["metadatas"][0][i] if results.get("metadatas") else {}
-                distance = results["distances"][0][i] if results.get("distances") else 2.0
-                distances.append(distance)
+                distance = results["distances"][0][i] if results.get("distances") else None
+                similarity = distance_to_similarity(distance, space) if distance is not None else 0.0
+                similarities.append(similarity)
                 chunks.append({
                     "content": doc,
                     "filename": metadata.get("filename", "unknown"),
-                    "distance": distance
+                    "distance": distance,
+                    "similarity": similarity
                 })
 
-        avg_distance = sum(distances) / len(distances) if distances else 2.0
-        return chunks, avg_distance
+        avg_similarity = sum(similarities) / len(similarities) if similarities else 0.0
+
+        if use_cache:
+            with _query_cache_lock:
+                _query_cache[key] = (now, chunks, avg_similarity)
+                _query_cache.move_to_end(key)
+                if len(_query_cache) > QUERY_CACHE_SIZE:
+                    _query_cache.popitem(last=False)
+
+        return chunks, avg_similarity
     except Exception as e:
+        # The collection may have been deleted or recreated; look it up again next time,
+        # unless another request has already replaced the handle that failed here
+        with _collection_lock:
+            if _vector_collection is collection:
+                _vector_collection = None
         print(f"Error querying vectors: {e}")
-        return [], 2.0
+        return [], 0.0
 
 
 def format_context(chunks: List[Dict[str, Any]]) -> str:
@@ -311,15 +434,11 @@ def format_context(chunks: List[Dict[str, Any]]) -> str:
     if not chunks:
         return "No relevant information found in the portfolio."
 
-    context_parts = []
-    for i, chunk in enumerate(chunks, 1):
-        source = chunk.get("filename", "unknown")
-        content = chunk.get("content", "")
-        # Limit each chunk to prevent context stuffing
-        content = content[:1500] if len(content) > 1500 else content
-        context_parts.append(f"[Source {i}: {source}]\n{content}")
-
-    return "\n\n---\n\n".join(context_parts)
+    # Limit each chunk to prevent context stuffing
+    return "\n\n---\n\n".join(
+        f"[Source {i}: {chunk.get('filename', 'unknown')}]\n{chunk.get('content', '')[:1500]}"
+        for i, chunk in enumerate(chunks, 1)
+    )
 
 
 # =============================================================================
@@ -418,11 +537,11 @@ async def chat(request: Request, body: ChatRequest):
 
     try:
         # Query vector store for relevant chunks
-        chunks, avg_distance = query_vectors(body.message, n_results=5)
+        chunks, avg_similarity = query_vectors(body.message, n_results=5)
 
         # Check if off-topic based on context relevance
-        if is_off_topic(body.message, avg_distance):
-            print(f"[OFF_TOPIC] IP:{ip_hash} dist:{avg_distance:.2f}")
+        if is_off_topic(body.message, avg_similarity):
+            print(f"[OFF_TOPIC] IP:{ip_hash} sim:{avg_similarity:.2f}")
             return ChatResponse(
                 response="I'm Zach's portfolio assistant and can help with questions about his experience, projects, and skills. What would you like to know about Zach's professional background?",
                 sources=None
@@ -4,7 +4,7 @@ from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel, Field
 from typing import List, Optional
 
-from services.embedding_service import EmbeddingService, EMBEDDING_MODELS
+from services.embedding_service import EMBEDDING_MODELS
 
 
 router = APIRouter()
@@ -37,9 +37,8 @@ async def embed_texts(request: EmbedRequest, req: Request):
     Returns embeddings and metadata.
     """
     try:
-        # Get OpenAI key from app state if needed
-        settings = req.app.state.settings
-        embedding_service = EmbeddingService(openai_api_key=settings.openai_api_key)
+        # Shared service keeps loaded models warm across requests
+        embedding_service = req.app.state.embedding_service
 
         result = embedding_service.embed(
             texts=request.texts,
@@ -65,8 +64,7 @@ async def embed_chunks(request: EmbedChunksRequest, req: Request):
     Returns chunks with their embeddings.
     """
     try:
-        settings = req.app.state.settings
-        embedding_service = EmbeddingService(openai_api_key=settings.openai_api_key)
+        embedding_service = req.app.state.embedding_service
 
         # Extract texts from chunks
         texts = [chunk.get("text", "") for chunk in request.chunks]
@@ -1,7 +1,7 @@
 """Assignment service for syncing and managing Canvas assignments."""
 
 import re
-from typing import List, Dict, Any, Optional, Callable
+from typing import List, Dict, Any, Optional, Callable, Tuple
 from dataclasses import dataclass
 import chromadb
 from chromadb.config import Settings as ChromaSettings
@@ -10,6 +10,8 @@ from pathlib import Path
 from services.database_service import DatabaseService
 from services.canvas_client import CanvasClient, CanvasConfig
 from services.embedding_service import EmbeddingService
+from services.embedding_cache import EmbeddingCache
+from services.batch_service import EMBEDDING_CACHE_FILENAME, distance_to_similarity
 from services.document_parser import parse_document
 import requests
 import tempfile
@@ -106,16 +108,19 @@ class AssignmentService:
         canvas_api_url: str,
         canvas_api_token: str,
         openai_api_key: Optional[str] = None,
-        chroma_persist_dir: str = "./chroma_db"
+        chroma_persist_dir: str = "./chroma_db",
+        embedding_service: Optional[EmbeddingService] = None
     ):
         self.db = db
         self.canvas_client = CanvasClient(CanvasConfig(
             api_url=canvas_api_url,
             api_token=canvas_api_token
         ))
-        self.embedding_service = EmbeddingService(openai_api_key=openai_api_key)
+        # Share an already-warm embedding service when one is provided (e.g. app.state)
+        self.embedding_service = embedding_service or EmbeddingService(openai_api_key=openai_api_key)
         self.chroma_persist_dir = chroma_persist_dir
         self._chroma_client = None
+        self._embedding_cache: Optional[EmbeddingCache] = None
 
     def _get_chroma_client(self) -> chromadb.ClientAPI:
         """Get or create ChromaDB client."""
@@ -127,6 +132,34 @@ class AssignmentService:
             )
         return self._chroma_client
 
+    def _embed_query_cached(self, query_text: str, embedding_model: str) -> List[float]:
+        """
+        Embed an assignment search query, reusing the on-disk embedding cache.
+
+        Shares the cache file (and key format) that BatchService keeps next to
+        the ChromaDB data, so re-running chunk search for an unchanged
+        assignment skips the embedding API call.
+        """
+        if self._embedding_cache is None:
+            self._embedding_cache = EmbeddingCache(
+                str(Path(self.chroma_persist_dir) / EMBEDDING_CACHE_FILENAME)
+            )
+        model_key = f"{embedding_model}:default"
+
+        key = EmbeddingCache.hash_text(query_text)
+        cached = self._embedding_cache.get_many([key], model_key).get(key)
+        if cached is not None:
+            return cached.tolist()
+
+        embed_result = self.embedding_service.embed(
+            texts=[query_text],
+            model=embedding_model
+        )
+        query_embedding = embed_result.get("embeddings", [[]])[0]
+        if query_embedding:
+            self._embedding_cache.put_many([key], [query_embedding], model_key)
+        return query_embedding
+
     # =========================================================================
     # Assignment Sync
     # =========================================================================
@@ -226,14 +259,16 @@ class AssignmentService:
         course_id: Optional[int] = None,
         start_date: Optional[str] = None,
         end_date: Optional[str] = None,
-        limit: int = 100
+        limit: int = 100,
+        after: Optional[Tuple[Optional[str], int]] = None
     ) -> List[Dict[str, Any]]:
-        """Get assignments with optional filters."""
+        """Get assignments with optional filters (see DatabaseService.get_assignments)."""
         return self.db.get_assignments(
             course_id=course_id,
             start_date=start_date,
             end_date=end_date,
-            limit=limit
+            limit=limit,
+            after=after
         )
 
     def get_upcoming_assignments(self, days: int = 7) -> List[Dict[str, Any]]:
@@ -400,12 +435,7 @@ class AssignmentService:
 
         query_text = " ".join(query_parts)
 
-        # Generate query embedding
-        embed_result = self.embedding_service.embed(
-            texts=[query_text],
-            model=embedding_model
-        )
-        query_embedding = embed_result.get("embeddings", [[]])[0]
+        query_embedding = self._embed_query_cached(query_text, embedding_model)
 
         if not query_embedding:
             return []
@@ -424,12 +454,13 @@ class AssignmentService:
             include=["documents", "metadatas", "distances"]
         )
 
-        # Format results
+        # Format results (distances are on the collection's metric; scores are cosine similarity)
+        space = (collection.metadata or {}).get("hnsw:space", "l2")
         chunks = []
         if results.get("ids") and results["ids"][0]:
             for i, chunk_id in enumerate(results["ids"][0]):
                 distance = results["distances"][0][i] if results.get("distances") else 0
-                similarity = 1 - distance  # Convert distance to similarity
+                similarity = distance_to_similarity(distance, space)
 
                 metadata = results["metadatas"][0][i] if results.get("metadatas") else {}
 
@@ -484,6 +515,7 @@ class AssignmentService:
             collection = client.get_collection(name=collection_name)
         except Exception:
             return []
+        space = (collection.metadata or {}).get("hnsw:space", "l2")
 
         # Build query chunks from assignment
         query_chunks = []
@@ -532,12 +564,7 @@ class AssignmentService:
                 continue
 
             try:
-                # Generate query embedding
-                embed_result = self.embedding_service.embed(
-                    texts=[query_text],
-                    model=embedding_model
-                )
-                query_embedding = embed_result.get("embeddings", [[]])[0]
+                query_embedding = self._embed_query_cached(query_text, embedding_model)
 
                 if not query_embedding:
                     continue
@@ -553,7 +580,7 @@ class AssignmentService:
                 if results.get("ids") and results["ids"][0]:
                     for j, chunk_id in enumerate(results["ids"][0]):
                         distance = results["distances"][0][j] if results.get("distances") else 0
-                        similarity = 1 - distance
+                        similarity = distance_to_similarity(distance, space)
 
                         # If we've seen this chunk, keep the higher relevance score
                         if chunk_id in all_chunks:
@@ -595,14 +622,17 @@ class AssignmentService:
     def get_cached_chunks(
         self,
         assignment_id: int,
-        collection_name: str = "canvas_materials"
+        collection_name: str = "canvas_materials",
+        cached: Optional[List[Dict[str, Any]]] = None
     ) -> List[ChunkSearchResult]:
         """
         Get cached chunks for an assignment from the database.
 
-        Returns full chunk content by looking up in ChromaDB.
+        Returns full chunk content by looking up in ChromaDB. Pass rows already
+        read with db.get_assignment_chunks as ``cached`` to skip reading them again.
         """
-        cached = self.db.get_assignment_chunks(assignment_id)
+        if cached is None:
+            cached = self.db.get_assignment_chunks(assignment_id)
         if not cached:
             return []
 
@@ -3,19 +3,34 @@
 import os
 import re
 import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Callable, Union
+from typing import List, Dict, Any, Optional, Callable, Tuple, Union
 from dataclasses import dataclass, field
 import chromadb
+import numpy as np
 from chromadb.config import Settings
 
 from services.document_parser import parse_document, get_supported_formats
 from services.chunking_service import ChunkingService
 from services.embedding_service import EmbeddingService
+from services.embedding_cache import EmbeddingCache
 from services.markdown_converter import ALL_SUPPORTED as ALL_SUPPORTED_EXTENSIONS
 from services.chunking_presets import ChunkingPreset, ContentTypeDetector, ChunkingPresetConfig
 
 
+# Chunks accumulated across files before one embedding call + ChromaDB add
+EMBED_SUPER_BATCH_SIZE = 1024
+
+# Embedding cache file, kept next to the ChromaDB data it was computed for
+EMBEDDING_CACHE_FILENAME = "embedding_cache.db"
+
+# Maximum number of query embeddings kept in memory per BatchService
+QUERY_CACHE_SIZE = 1024
+
+
 def clean_pdf_text(text: str) -> str:
     """
     Clean extracted PDF text to remove noise while preserving useful content.
@@ -110,6 +125,21 @@ def clean_pdf_text(text: str) -> str:
     return text.strip()
 
 
+def distance_to_similarity(distance: float, space: str) -> float:
+    """
+    Convert a ChromaDB distance between unit-length embeddings to cosine similarity.
+
+    Args:
+        distance: Distance returned by collection.query
+        space: The collection's hnsw:space ("ip", "cosine" or "l2")
+    """
+    if space == "l2":
+        # Chroma's l2 is squared: |a - b|^2 = 2 - 2cos for unit vectors
+        return 1 - distance / 2
+    # ip and cosine distances are both 1 - a.b
+    return 1 - distance
+
+
 @dataclass
 class BatchConfig:
     """Configuration for batch processing."""
@@ -204,34 +234,167 @@ class BatchResult:
     persist_directory: str = ""
 
 
+def prepare_file(
+    file_path: str,
+    config: BatchConfig,
+    chunking_service: ChunkingService,
+    progress_callback: Optional[Callable[[str], None]] = None
+) -> Dict[str, Any]:
+    """
+    Read, parse, clean and chunk a file without touching embeddings or ChromaDB.
+
+    The result holds only picklable primitives (plus the dataclass config), so
+    it can be produced in a worker process.
+
+    Args:
+        file_path: Path of the file to prepare
+        config: Batch processing configuration
+        chunking_service: Chunker to split the text with
+        progress_callback: Optional callback for status messages
+
+    Returns:
+        Dict with filename, file_path, document_id, the effective config,
+        chunk_texts and (start, end) chunk_spans, or an "error" key on failure
+    """
+    filename = os.path.basename(file_path)
+
+    try:
+        # Read file
+        with open(file_path, 'rb') as f:
+            content_bytes = f.read()
+
+        # Parse document
+        if progress_callback:
+            progress_callback(f"Parsing {filename}...")
+
+        parsed = parse_document(content_bytes, filename)
+        text_content = parsed.get("content", "")
+
+        # Clean text if enabled (removes PDF artifacts while preserving diagrams/figures)
+        if config.clean_text and text_content:
+            text_content = clean_pdf_text(text_content)
+
+        if not text_content.strip():
+            return {"filename": filename, "error": "Empty document or failed to extract text"}
+
+        # Auto-detect preset if enabled and no preset specified
+        effective_config = config
+        if config.auto_detect_preset and not config.preset:
+            detected_preset = ContentTypeDetector.detect(
+                filename=filename,
+                content=text_content,
+                file_path=file_path
+            )
+            # Create a copy of config with preset applied
+            effective_config = BatchConfig(
+                chunking_strategy=detected_preset.value.strategy,
+                chunk_size=detected_preset.value.chunk_size,
+                chunk_overlap=detected_preset.value.chunk_overlap,
+                preset=detected_preset.value.name,
+                auto_detect_preset=False,
+                embedding_model=config.embedding_model,
+                embedding_dimensions=config.embedding_dimensions,
+                collection_name=config.collection_name,
+                persist_directory=config.persist_directory,
+                batch_size=config.batch_size,
+                skip_existing=config.skip_existing,
+                separators=detected_preset.value.separators,
+                keep_separator=detected_preset.value.keep_separator
+            )
+            if progress_callback:
+                progress_callback(f"Auto-detected preset: {detected_preset.value.name} for {filename}")
+
+        # Chunk the document with effective config
+        if progress_callback:
+            progress_callback(f"Chunking {filename} ({effective_config.chunk_size} chars, {effective_config.chunking_strategy})...")
+
+        chunk_kwargs = {
+            "text": text_content,
+            "strategy": effective_config.chunking_strategy,
+            "chunk_size": effective_config.chunk_size,
+            "chunk_overlap": effective_config.chunk_overlap,
+        }
+        if effective_config.separators:
+            chunk_kwargs["separators"] = effective_config.separators
+        chunk_kwargs["keep_separator"] = effective_config.keep_separator
+
+        chunks = chunking_service.chunk(**chunk_kwargs)
+
+        if not chunks:
+            return {"filename": filename, "error": "No chunks created"}
+
+        return {
+            "filename": filename,
+            "file_path": file_path,
+            "document_id": BatchService._generate_document_id(filename, text_content),
+            "config": effective_config,
+            "chunk_texts": [c.get("content", "") for c in chunks],
+            "chunk_spans": [(c.get("char_start", 0), c.get("char_end", 0)) for c in chunks],
+        }
+
+    except Exception as e:
+        return {"filename": filename, "error": str(e)}
+
+
+# Chunker owned by each worker process, created on first use so the parent's
+# services (and any loaded models) are never pickled
+_worker_chunking_service: Optional[ChunkingService] = None
+
+
+def prepare_file_in_worker(file_path: str, config: BatchConfig) -> Dict[str, Any]:
+    """ProcessPoolExecutor entry point for prepare_file."""
+    global _worker_chunking_service
+    if _worker_chunking_service is None:
+        _worker_chunking_service = ChunkingService()
+    return prepare_file(file_path, config, _worker_chunking_service)
+
+
 class BatchService:
     """Service for batch processing files into a vector database."""
 
     SUPPORTED_EXTENSIONS = ALL_SUPPORTED_EXTENSIONS
 
-    def __init__(self, openai_api_key: Optional[str] = None):
+    def __init__(
+        self,
+        openai_api_key: Optional[str] = None,
+        embedding_service: Optional[EmbeddingService] = None
+    ):
         self.chunking_service = ChunkingService()
-        self.embedding_service = EmbeddingService(openai_api_key=openai_api_key)
-        self._chroma_client = None
+        # Share an already-warm embedding service when one is provided (e.g. app.state)
+        self.embedding_service = embedding_service or EmbeddingService(openai_api_key=openai_api_key)
+        # One client per ChromaDB directory; the API shares this service across threads
+        self._chroma_clients: Dict[str, chromadb.ClientAPI] = {}
+        self._clients_lock = threading.Lock()
         self._collection = None
         self._current_config: Optional[BatchConfig] = None
+        self._embedding_caches: Dict[str, EmbeddingCache] = {}
+        self._query_cache: "OrderedDict[Tuple[str, Optional[int], str], List[float]]" = OrderedDict()
+        self._query_cache_lock = threading.Lock()
 
     def _get_chroma_client(self, persist_directory: str) -> chromadb.ClientAPI:
-        """Get or create ChromaDB client."""
-        if self._chroma_client is None or (self._current_config is None) or self._current_config.persist_directory != persist_directory:
-            # Ensure directory exists
-            Path(persist_directory).mkdir(parents=True, exist_ok=True)
-
-            self._chroma_client = chromadb.PersistentClient(
-                path=persist_directory,
-                settings=Settings(anonymized_telemetry=False)
-            )
-        return self._chroma_client
+        """Get or create the ChromaDB client for a directory."""
+        with self._clients_lock:
+            client = self._chroma_clients.get(persist_directory)
+            if client is None:
+                # Ensure directory exists
+                Path(persist_directory).mkdir(parents=True, exist_ok=True)
+
+                client = self._chroma_clients[persist_directory] = chromadb.PersistentClient(
+                    path=persist_directory,
+                    settings=Settings(anonymized_telemetry=False)
+                )
+            return client
 
     def _get_collection(self, config: BatchConfig) -> chromadb.Collection:
         """Get or create ChromaDB collection."""
         client = self._get_chroma_client(config.persist_directory)
 
+        # Existing collections keep the distance space they were built with
+        try:
+            return client.get_collection(name=config.collection_name)
+        except Exception:
+            pass
+
         # Get model info for metadata
         model_info = self.embedding_service.get_model_info(config.embedding_model)
         dimensions = config.embedding_dimensions or (model_info.get("dimensions") if model_info else 384)
@@ -239,6 +402,9 @@ class BatchService:
         return client.get_or_create_collection(
             name=config.collection_name,
             metadata={
+                # Embeddings are unit-length, so inner product ranks like cosine
+                # without the per-comparison normalization
+                "hnsw:space": "ip",
                 "embedding_model": config.embedding_model,
                 "dimensions": dimensions,
                 "chunking_strategy": config.chunking_strategy,
@@ -247,13 +413,15 @@ class BatchService:
             }
         )
 
-    def _generate_document_id(self, filename: str, content: str) -> str:
+    @staticmethod
+    def _generate_document_id(filename: str, content: str) -> str:
         """Generate a unique document ID based on filename and content hash."""
         content_hash = hashlib.md5(content.encode()).hexdigest()[:8]
         safe_filename = Path(filename).stem.replace(" ", "_")[:32]
         return f"{safe_filename}_{content_hash}"
 
-    def _generate_chunk_id(self, doc_id: str, chunk_index: int) -> str:
+    @staticmethod
+    def _generate_chunk_id(doc_id: str, chunk_index: int) -> str:
         """Generate a unique chunk ID."""
         return f"{doc_id}_chunk_{chunk_index}"
 
@@ -265,135 +433,113 @@ class BatchService:
     ) -> ProcessingResult:
         """Process a single file into the vector database."""
         self._current_config = config
-        filename = os.path.basename(file_path)
+        prepared = prepare_file(file_path, config, self.chunking_service, progress_callback)
+        return self.embed_and_upsert([prepared], progress_callback)[0]
 
-        try:
-            # Read file
-            with open(file_path, 'rb') as f:
-                content_bytes = f.read()
+    def embed_and_upsert(
+        self,
+        prepared_files: List[Dict[str, Any]],
+        progress_callback: Optional[Callable[[str], None]] = None
+    ) -> List[ProcessingResult]:
+        """
+        Embed and store the chunks of several prepared files together.
 
-            # Parse document
-            if progress_callback:
-                progress_callback(f"Parsing {filename}...")
+        All chunks go through one embedding call and one collection.add, so
+        the model sees full batches even when individual files are small. If
+        that fails, the files are retried one at a time.
 
-            parsed = parse_document(content_bytes, filename)
-            text_content = parsed.get("content", "")
+        Args:
+            prepared_files: Results of prepare_file for files sharing a collection
+            progress_callback: Optional callback for status messages
 
-            # Clean text if enabled (removes PDF artifacts while preserving diagrams/figures)
-            if config.clean_text and text_content:
-                text_content = clean_pdf_text(text_content)
+        Returns:
+            One ProcessingResult per prepared file, in input order
+        """
+        results: List[Optional[ProcessingResult]] = [None] * len(prepared_files)
+        to_store = []
 
-            if not text_content.strip():
-                return ProcessingResult(
-                    filename=filename,
+        for i, prepared in enumerate(prepared_files):
+            if prepared.get("error"):
+                results[i] = ProcessingResult(
+                    filename=prepared["filename"],
                     success=False,
-                    error="Empty document or failed to extract text"
+                    error=prepared["error"]
                 )
+            else:
+                to_store.append(i)
 
-            # Auto-detect preset if enabled and no preset specified
-            effective_config = config
-            detected_preset = None
-            if config.auto_detect_preset and not config.preset:
-                detected_preset = ContentTypeDetector.detect(
-                    filename=filename,
-                    content=text_content,
-                    file_path=file_path
-                )
-                # Create a copy of config with preset applied
-                effective_config = BatchConfig(
-                    chunking_strategy=detected_preset.value.strategy,
-                    chunk_size=detected_preset.value.chunk_size,
-                    chunk_overlap=detected_preset.value.chunk_overlap,
-                    preset=detected_preset.value.name,
-                    auto_detect_preset=False,
-                    embedding_model=config.embedding_model,
-                    embedding_dimensions=config.embedding_dimensions,
-                    collection_name=config.collection_name,
-                    persist_directory=config.persist_directory,
-                    batch_size=config.batch_size,
-                    skip_existing=config.skip_existing,
-                    separators=detected_preset.value.separators,
-                    keep_separator=detected_preset.value.keep_separator
-                )
-                if progress_callback:
-                    progress_callback(f"Auto-detected preset: {detected_preset.value.name} for {filename}")
+        if not to_store:
+            return results
 
-            # Generate document ID
-            doc_id = self._generate_document_id(filename, text_content)
+        try:
+            effective_config: BatchConfig = prepared_files[to_store[0]]["config"]
 
             # Get collection
             collection = self._get_collection(effective_config)
 
-            # Check if document already exists
-            if effective_config.skip_existing:
-                existing = collection.get(where={"document_id": doc_id})
-                if existing and existing.get("ids"):
-                    return ProcessingResult(
-                        filename=filename,
+            # Check which documents already exist (or repeat earlier in this batch)
+            seen_doc_ids = set()
+            new_files = []
+            for i in to_store:
+                prepared = prepared_files[i]
+                doc_id = prepared["document_id"]
+
+                exists = doc_id in seen_doc_ids
+                if not exists and effective_config.skip_existing:
+                    existing = collection.get(where={"document_id": doc_id})
+                    exists = bool(existing and existing.get("ids"))
+
+                if exists:
+                    results[i] = ProcessingResult(
+                        filename=prepared["filename"],
                         success=True,
                         chunks_created=0,
                         embeddings_created=0,
                         document_id=doc_id,
                         error="Skipped - already exists"
                     )
+                else:
+                    seen_doc_ids.add(doc_id)
+                    new_files.append(i)
 
-            # Chunk the document with effective config
-            if progress_callback:
-                progress_callback(f"Chunking {filename} ({effective_config.chunk_size} chars, {effective_config.chunking_strategy})...")
-
-            chunk_kwargs = {
-                "text": text_content,
-                "strategy": effective_config.chunking_strategy,
-                "chunk_size": effective_config.chunk_size,
-                "chunk_overlap": effective_config.chunk_overlap,
-            }
-            if effective_config.separators:
-                chunk_kwargs["separators"] = effective_config.separators
-            chunk_kwargs["keep_separator"] = effective_config.keep_separator
-
-            chunks = self.chunking_service.chunk(**chunk_kwargs)
-
-            if not chunks:
-                return ProcessingResult(
-                    filename=filename,
-                    success=False,
-                    error="No chunks created"
-                )
+            if not new_files:
+                return results
 
-            # Extract chunk texts
-            chunk_texts = [c.get("content", "") for c in chunks]
+            # Prepare data for ChromaDB
+            ids = []
+            chunk_texts = []
+            metadatas = []
+            for i in new_files:
+                prepared = prepared_files[i]
+                doc_id = prepared["document_id"]
+                texts = prepared["chunk_texts"]
+
+                ids.extend(self._generate_chunk_id(doc_id, j) for j in range(len(texts)))
+                chunk_texts.extend(texts)
+                for j, (start_char, end_char) in enumerate(prepared["chunk_spans"]):
+                    metadatas.append({
+                        "document_id": doc_id,
+                        "filename": prepared["filename"],
+                        "file_path": prepared["file_path"],
+                        "chunk_index": j,
+                        "start_char": start_char,
+                        "end_char": end_char,
+                        "char_count": len(texts[j])
+                    })
 
             # Generate embeddings
             if progress_callback:
-                progress_callback(f"Generating embeddings for {filename} ({len(chunks)} chunks)...")
-
-            embed_result = self.embedding_service.embed(
-                texts=chunk_texts,
-                model=effective_config.embedding_model,
-                dimensions=effective_config.embedding_dimensions,
-                batch_size=effective_config.batch_size
-            )
+                if len(new_files) == 1:
+                    label = prepared_files[new_files[0]]["filename"]
+                else:
+                    label = f"{len(new_files)} files"
+                progress_callback(f"Generating embeddings for {label} ({len(chunk_texts)} chunks)...")
 
-            embeddings = embed_result.get("embeddings", [])
-
-            # Prepare data for ChromaDB
-            ids = [self._generate_chunk_id(doc_id, i) for i in range(len(chunks))]
-            metadatas = []
-
-            for i, chunk in enumerate(chunks):
-                metadatas.append({
-                    "document_id": doc_id,
-                    "filename": filename,
-                    "file_path": file_path,
-                    "chunk_index": i,
-                    "start_char": chunk.get("char_start", 0),
-                    "end_char": chunk.get("char_end", 0),
-                    "char_count": len(chunk_texts[i])
-                })
+            embeddings = self._embed_deduplicated(chunk_texts, effective_config)
 
             # Store in ChromaDB
             if progress_callback:
-                progress_callback(f"Storing {len(chunks)} chunks in ChromaDB...")
+                progress_callback(f"Storing {len(chunk_texts)} chunks in ChromaDB...")
 
             collection.add(
                 ids=ids,
@@ -402,67 +548,231 @@ class BatchService:
                 metadatas=metadatas
             )
 
-            return ProcessingResult(
-                filename=filename,
-                success=True,
-                chunks_created=len(chunks),
-                embeddings_created=len(embeddings),
-                document_id=doc_id
-            )
+            for i in new_files:
+                prepared = prepared_files[i]
+                n_chunks = len(prepared["chunk_texts"])
+                results[i] = ProcessingResult(
+                    filename=prepared["filename"],
+                    success=True,
+                    chunks_created=n_chunks,
+                    embeddings_created=n_chunks,
+                    document_id=prepared["document_id"]
+                )
 
         except Exception as e:
-            return ProcessingResult(
-                filename=filename,
-                success=False,
-                error=str(e)
+            unfinished = [i for i in to_store if results[i] is None]
+            if len(unfinished) > 1:
+                # One bad file (e.g. over the token limit) shouldn't fail the rest;
+                # retry each file on its own so only the culprit records the error
+                for i in unfinished:
+                    results[i] = self.embed_and_upsert([prepared_files[i]], progress_callback)[0]
+            else:
+                for i in unfinished:
+                    results[i] = ProcessingResult(
+                        filename=prepared_files[i]["filename"],
+                        success=False,
+                        error=str(e)
+                    )
+
+        return results
+
+    def _get_embedding_cache(self, persist_directory: str) -> EmbeddingCache:
+        """Get the embedding cache stored alongside a ChromaDB directory."""
+        with self._clients_lock:
+            if persist_directory not in self._embedding_caches:
+                self._embedding_caches[persist_directory] = EmbeddingCache(
+                    str(Path(persist_directory) / EMBEDDING_CACHE_FILENAME)
+                )
+            return self._embedding_caches[persist_directory]
+
+    def _embed_deduplicated(self, texts: List[str], config: BatchConfig) -> List[List[float]]:
+        """
+        Embed texts, computing each distinct chunk only once.
+
+        Chunks are keyed by SHA-256 of their text. Repeats within the batch and
+        chunks embedded by earlier runs (syllabi, slide headers, re-uploads)
+        reuse the stored vector instead of going through the model again.
+        """
+        cache = self._get_embedding_cache(config.persist_directory)
+        model_key = f"{config.embedding_model}:{config.embedding_dimensions or 'default'}"
+
+        hashes = [EmbeddingCache.hash_text(text) for text in texts]
+        vectors = cache.get_many(hashes, model_key)
+
+        # Distinct chunks that still need embedding, in first-seen order
+        missing: Dict[bytes, str] = {}
+        for key, text in zip(hashes, texts):
+            if key not in vectors and key not in missing:
+                missing[key] = text
+
+        if missing:
+            embed_result = self.embedding_service.embed(
+                texts=list(missing.values()),
+                model=config.embedding_model,
+                dimensions=config.embedding_dimensions,
+                batch_size=config.batch_size
+            )
+            new_embeddings = embed_result.get("embeddings", [])
+            cache.put_many(list(missing), new_embeddings, model_key)
+            vectors.update(zip(missing, np.asarray(new_embeddings, dtype=np.float32)))
+
+        return [vectors[key].tolist() for key in hashes]
+
+    def embed_query(self, query_text: str, config: BatchConfig) -> List[float]:
+        """
+        Embed a search query, reusing earlier embeddings of the same question.
+
+        The in-memory LRU is keyed on the normalized (stripped, lowercased)
+        query, so repeat questions skip the model or API call. The text that
+        gets embedded is always the original query.
+        """
+        return self.embed_queries([query_text], config)[0]
+
+    def embed_queries(self, query_texts: List[str], config: BatchConfig) -> List[List[float]]:
+        """Embed several search queries with one embedding call for all cache misses."""
+        keys = [
+            (config.embedding_model, config.embedding_dimensions, text.strip().lower())
+            for text in query_texts
+        ]
+        embeddings: List[Optional[List[float]]] = [
+            self.get_cached_query_embedding(text, config) for text in query_texts
+        ]
+
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            # Embed one original text per cache key. Queries bypass the on-disk
+            # chunk cache, which would otherwise keep every search string forever.
+            texts_by_key: Dict[Tuple[str, Optional[int], str], str] = {}
+            for i in missing:
+                texts_by_key.setdefault(keys[i], query_texts[i])
+
+            embed_result = self.embedding_service.embed(
+                texts=list(texts_by_key.values()),
+                model=config.embedding_model,
+                dimensions=config.embedding_dimensions,
+                batch_size=config.batch_size
             )
+            computed = dict(zip(texts_by_key, embed_result.get("embeddings", [])))
+
+            with self._query_cache_lock:
+                for key, embedding in computed.items():
+                    self._query_cache[key] = embedding
+                for i in missing:
+                    embeddings[i] = computed[keys[i]]
+                while len(self._query_cache) > QUERY_CACHE_SIZE:
+                    self._query_cache.popitem(last=False)
+
+        return embeddings
+
+    def get_cached_query_embedding(self, query_text: str, config: BatchConfig) -> Optional[List[float]]:
+        """Return a query's embedding from the in-memory LRU, or None if it isn't cached."""
+        key = (config.embedding_model, config.embedding_dimensions, query_text.strip().lower())
+
+        with self._query_cache_lock:
+            cached = self._query_cache.get(key)
+            if cached is not None:
+                self._query_cache.move_to_end(key)
+            return cached
 
     def process_directory(
         self,
         directory: str,
         config: BatchConfig,
         recursive: bool = True,
-        progress_callback: Optional[Callable[[str, int, int], None]] = None
+        progress_callback: Optional[Callable[[str, int, int], None]] = None,
+        workers: int = 1
     ) -> BatchResult:
         """Process all supported files in a directory."""
         # Find all supported files
         files = self._find_files(directory, recursive)
 
-        return self.process_files(files, config, progress_callback)
+        return self.process_files(files, config, progress_callback, workers=workers)
 
     def process_files(
         self,
         file_paths: List[str],
         config: BatchConfig,
-        progress_callback: Optional[Callable[[str, int, int], None]] = None
+        progress_callback: Optional[Callable[[str, int, int], None]] = None,
+        workers: int = 1
     ) -> BatchResult:
-        """Process a list of files."""
+        """
+        Process a list of files.
+
+        Files are parsed and chunked (in a process pool when workers > 1), then
+        embedded and written in super-batches of about EMBED_SUPER_BATCH_SIZE
+        chunks, so each ChromaDB add covers many small files at once. Embedding
+        and writes stay on this process.
+
+        Args:
+            file_paths: Files to process
+            config: Batch processing configuration
+            progress_callback: Optional callback(message, current, total)
+            workers: Number of parse/chunk worker processes
+
+        Returns:
+            BatchResult with per-file results, in input order
+        """
         self._current_config = config
+        total = len(file_paths)
 
         result = BatchResult(
-            total_files=len(file_paths),
+            total_files=total,
             collection_name=config.collection_name,
             persist_directory=config.persist_directory
         )
 
-        for i, file_path in enumerate(file_paths):
-            if progress_callback:
-                progress_callback(f"Processing {os.path.basename(file_path)}", i + 1, len(file_paths))
+        pending: List[Dict[str, Any]] = []
+        pending_chunks = 0
 
-            file_result = self.process_file(
-                file_path,
-                config,
-                progress_callback=lambda msg: progress_callback(msg, i + 1, len(file_paths)) if progress_callback else None
-            )
+        def flush(current: int) -> None:
+            nonlocal pending, pending_chunks
+            if not pending:
+                return
+
+            for file_result in self.embed_and_upsert(
+                pending,
+                progress_callback=lambda msg: progress_callback(msg, current, total) if progress_callback else None
+            ):
+                result.results.append(file_result)
+
+                if file_result.success:
+                    result.successful += 1
+                    result.total_chunks += file_result.chunks_created
+                    result.total_embeddings += file_result.embeddings_created
+                else:
+                    result.failed += 1
 
-            result.results.append(file_result)
+            pending = []
+            pending_chunks = 0
 
-            if file_result.success:
-                result.successful += 1
-                result.total_chunks += file_result.chunks_created
-                result.total_embeddings += file_result.embeddings_created
+        executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 and total > 1 else None
+        try:
+            if executor:
+                prepared_files = executor.map(
+                    prepare_file_in_worker,
+                    file_paths,
+                    [config] * total,
+                    chunksize=4
+                )
             else:
-                result.failed += 1
+                prepared_files = (
+                    prepare_file(file_path, config, self.chunking_service)
+                    for file_path in file_paths
+                )
+
+            for i, prepared in enumerate(prepared_files):
+                if progress_callback:
+                    progress_callback(f"Processing {prepared['filename']}", i + 1, total)
+
+                pending.append(prepared)
+                pending_chunks += len(prepared.get("chunk_texts", ()))
+                if pending_chunks >= EMBED_SUPER_BATCH_SIZE:
+                    flush(i + 1)
+
+            flush(total)
+        finally:
+            if executor:
+                executor.shutdown()
 
         return result
 
@@ -486,17 +796,12 @@ class BatchService:
         self,
         query_text: str,
         config: BatchConfig,
-        n_results: int = 5
+        n_results: int = 5,
+        query_embedding: Optional[List[float]] = None
     ) -> Dict[str, Any]:
-        """Query the vector database."""
-        # Generate query embedding
-        embed_result = self.embedding_service.embed(
-            texts=[query_text],
-            model=config.embedding_model,
-            dimensions=config.embedding_dimensions
-        )
-
-        query_embedding = embed_result.get("embeddings", [[]])[0]
+        """Query the vector database (pass query_embedding to skip embedding the text)."""
+        if query_embedding is None:
+            query_embedding = self.embed_query(query_text, config)
 
         # Query ChromaDB
         collection = self._get_collection(config)
@@ -507,6 +812,9 @@ class BatchService:
             include=["documents", "metadatas", "distances"]
         )
 
+        # Collections created before the switch to inner product use Chroma's default (l2)
+        space = (collection.metadata or {}).get("hnsw:space", "l2")
+
         # Format results
         formatted = []
         if results.get("ids") and results["ids"][0]:
@@ -516,7 +824,7 @@ class BatchService:
                     "content": results["documents"][0][i] if results.get("documents") else "",
                     "metadata": results["metadatas"][0][i] if results.get("metadatas") else {},
                     "distance": results["distances"][0][i] if results.get("distances") else 0,
-                    "similarity": 1 - results["distances"][0][i] if results.get("distances") else 1
+                    "similarity": distance_to_similarity(results["distances"][0][i], space) if results.get("distances") else 1
                 })
 
         return {
@@ -525,6 +833,15 @@ class BatchService:
             "count": len(formatted)
         }
 
+    def get_collection(self, config: BatchConfig) -> chromadb.Collection:
+        """Get an existing collection without creating it (raises ValueError if missing)."""
+        client = self._get_chroma_client(config.persist_directory)
+
+        try:
+            return client.get_collection(name=config.collection_name)
+        except Exception:
+            raise ValueError(f"Collection '{config.collection_name}' not found")
+
     def get_collection_info(self, config: BatchConfig) -> Dict[str, Any]:
         """Get information about a collection."""
         collection = self._get_collection(config)
@@ -535,6 +852,34 @@ class BatchService:
             "metadata": collection.metadata
         }
 
+    def query_dimensions(
+        self,
+        embedding_model: str,
+        collection_metadata: Optional[Dict[str, Any]]
+    ) -> Optional[int]:
+        """
+        Dimension override to embed queries with for a collection.
+
+        Collections built with a shortened text-embedding-3 size (see
+        BatchConfig.embedding_dimensions) record it in their metadata, and
+        queries must be embedded at the same size to be comparable.
+
+        Returns:
+            The stored size, or None if the collection uses the model's native size
+        """
+        metadata = collection_metadata or {}
+        model_info = self.embedding_service.get_model_info(embedding_model) or {}
+        dimensions = metadata.get("dimensions")
+
+        if (
+            model_info.get("supports_dimensions")
+            and metadata.get("embedding_model") == embedding_model
+            and dimensions
+            and dimensions != model_info.get("dimensions")
+        ):
+            return dimensions
+        return None
+
     def list_collections(self, persist_directory: str) -> List[Dict[str, Any]]:
         """List all collections in the database."""
         client = self._get_chroma_client(persist_directory)
@@ -1,12 +1,31 @@
 """Comprehensive Canvas LMS API client with deep recursive file discovery."""
 
+import asyncio
 import re
+import threading
+import time
+import aiohttp
 import requests
-from typing import List, Dict, Any, Optional, Set, Callable
+from requests.adapters import HTTPAdapter
+from typing import List, Dict, Any, Optional, Set, Callable, Tuple
 from dataclasses import dataclass, field
 from pathlib import Path
 
 
+# Maximum number of Canvas file downloads in flight at once
+DOWNLOAD_CONCURRENCY = 8
+
+# Maximum number of courses scanned at once by discover_courses_async
+DISCOVERY_CONCURRENCY = 4
+
+# Keep-alive connections pooled per host for Canvas API calls
+HTTP_POOL_SIZE = 32
+
+# Bytes read from the response per write when downloading (1 MiB keeps
+# per-chunk overhead low on large slide decks without buffering whole files)
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+
+
 @dataclass
 class CanvasFile:
     """Represents a file found in Canvas."""
@@ -21,6 +40,7 @@ class CanvasFile:
     source: str  # Where the file was found
     modified_at: Optional[str] = None
     folder_path: Optional[str] = None
+    etag: Optional[str] = None  # HTTP ETag of the last download
 
 
 @dataclass
@@ -28,6 +48,36 @@ class CanvasConfig:
     """Canvas API configuration."""
     api_url: str
     api_token: str
+    # Sustained rate of async Canvas requests, kept under Canvas's throttling
+    requests_per_second: float = 10.0
+
+
+class AsyncRateLimiter:
+    """
+    Token bucket that spaces out requests from concurrent coroutines.
+
+    Up to `rate` requests start immediately; after that each caller waits
+    its turn at `rate` per second. State is only touched between awaits,
+    so no lock is needed and one limiter can serve several event loops
+    run one after another.
+    """
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.last = time.monotonic()
+
+    async def acquire(self):
+        """Wait until a request may start."""
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+
+        # Take a token now, going into debt if the bucket is empty; later
+        # callers see the debt and queue up behind this one
+        self.tokens -= 1
+        if self.tokens < 0:
+            await asyncio.sleep(-self.tokens / self.rate)
 
 
 class CanvasClient:
@@ -53,7 +103,31 @@ class CanvasClient:
             "Authorization": f"Bearer {config.api_token}",
             "Accept": "application/json"
         })
-        self._seen_file_ids: Set[int] = set()
+        # Every Canvas call reuses pooled keep-alive connections (and their TLS
+        # sessions); the default pool of 10 drops connections under concurrency
+        adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._local = threading.local()
+        self.limiter = AsyncRateLimiter(config.requests_per_second)
+
+    @property
+    def _seen_file_ids(self) -> Set[int]:
+        """File IDs already found by the discovery running on this thread."""
+        seen = getattr(self._local, "seen_file_ids", None)
+        if seen is None:
+            seen = self._local.seen_file_ids = set()
+        return seen
+
+    def close(self):
+        """Close pooled connections."""
+        self.session.close()
+
+    def __enter__(self) -> "CanvasClient":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
 
     def _get(self, endpoint: str, params: Optional[Dict] = None) -> Any:
         """Make GET request to Canvas API."""
@@ -234,6 +308,47 @@ class CanvasClient:
 
         return files
 
+    async def discover_courses_async(
+        self,
+        course_ids: List[int],
+        include_assignments: bool = False,
+        concurrency: int = DISCOVERY_CONCURRENCY,
+        progress_callback: Optional[Callable[[str], None]] = None,
+        course_done_callback: Optional[Callable[[int, List[CanvasFile]], None]] = None
+    ) -> List[List[CanvasFile]]:
+        """
+        Discover files in several courses concurrently.
+
+        Each course runs discover_all_files on a worker thread, so the paginated
+        requests of different courses overlap instead of running back to back.
+        Duplicate tracking is per thread, so courses don't interfere.
+
+        Args:
+            course_ids: Courses to scan
+            include_assignments: Whether to include assignment files
+            concurrency: Maximum number of courses scanned at once
+            progress_callback: Optional callback for status messages
+            course_done_callback: Optional callback(course_id, files) per finished course
+
+        Returns:
+            One list of files per course, in input order
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def discover_one(course_id: int) -> List[CanvasFile]:
+            async with semaphore:
+                files = await asyncio.to_thread(
+                    self.discover_all_files,
+                    course_id,
+                    include_assignments,
+                    progress_callback
+                )
+            if course_done_callback:
+                course_done_callback(course_id, files)
+            return files
+
+        return await asyncio.gather(*(discover_one(cid) for cid in course_ids))
+
     def _discover_files_section(self, course_id: int, course_name: str) -> List[CanvasFile]:
         """Recursively get all files from the Files section."""
         files = []
@@ -516,35 +631,144 @@ class CanvasClient:
     # File Download
     # =========================================================================
 
-    def download_file(self, canvas_file: CanvasFile, download_dir: str) -> Optional[str]:
-        """Download a file and return its local path."""
-        if not canvas_file.url:
-            return None
-
-        # Create course subdirectory
+    def _local_path(self, canvas_file: CanvasFile, download_dir: str) -> Path:
+        """Get the local download path for a file, creating its course directory."""
         safe_course_name = re.sub(r'[^\w\-_]', '_', canvas_file.course_name)[:50]
         course_dir = Path(download_dir) / safe_course_name
         course_dir.mkdir(parents=True, exist_ok=True)
 
-        local_path = course_dir / canvas_file.display_name
+        return course_dir / canvas_file.display_name
+
+    def download_file(
+        self,
+        canvas_file: CanvasFile,
+        download_dir: str,
+        etag: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        Download a file and return its local path.
+
+        If `etag` is given and the file is already on disk, the request is
+        conditional: a 304 keeps the local copy. The response ETag is stored
+        on canvas_file.etag.
+        """
+        if not canvas_file.url:
+            return None
+
+        local_path = self._local_path(canvas_file, download_dir)
+        conditional = etag is not None and local_path.exists()
 
         # Skip if already downloaded
-        if local_path.exists() and local_path.stat().st_size == canvas_file.size:
+        if not conditional and local_path.exists() and local_path.stat().st_size == canvas_file.size:
             return str(local_path)
 
+        headers = {"If-None-Match": etag} if conditional else None
+
         try:
-            response = self.session.get(canvas_file.url, stream=True, timeout=60)
-            response.raise_for_status()
+            with self.session.get(canvas_file.url, headers=headers, stream=True, timeout=60) as response:
+                if response.status_code == 304:
+                    canvas_file.etag = response.headers.get("ETag", etag)
+                    return str(local_path)
 
-            with open(local_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
+                response.raise_for_status()
+
+                with open(local_path, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                        f.write(chunk)
+
+                canvas_file.etag = response.headers.get("ETag")
 
             return str(local_path)
 
         except Exception:
             return None
 
+    async def download_file_async(
+        self,
+        session: aiohttp.ClientSession,
+        canvas_file: CanvasFile,
+        download_dir: str,
+        etag: Optional[str] = None
+    ) -> Optional[str]:
+        """Download a file with an aiohttp session and return its local path (see download_file)."""
+        if not canvas_file.url:
+            return None
+
+        local_path = self._local_path(canvas_file, download_dir)
+        conditional = etag is not None and local_path.exists()
+
+        # Skip if already downloaded
+        if not conditional and local_path.exists() and local_path.stat().st_size == canvas_file.size:
+            return str(local_path)
+
+        headers = {"If-None-Match": etag} if conditional else None
+
+        try:
+            await self.limiter.acquire()
+            async with session.get(canvas_file.url, headers=headers) as response:
+                if response.status == 304:
+                    canvas_file.etag = response.headers.get("ETag", etag)
+                    return str(local_path)
+
+                response.raise_for_status()
+
+                with open(local_path, 'wb') as f:
+                    async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                        f.write(chunk)
+
+                canvas_file.etag = response.headers.get("ETag")
+
+            return str(local_path)
+
+        except Exception:
+            return None
+
+    def open_async_session(self, concurrency: int = DOWNLOAD_CONCURRENCY) -> aiohttp.ClientSession:
+        """Create an aiohttp session with the Canvas auth header and a bounded connection pool."""
+        return aiohttp.ClientSession(
+            headers={"Authorization": f"Bearer {self.config.api_token}"},
+            connector=aiohttp.TCPConnector(limit=concurrency),
+            timeout=aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=60)
+        )
+
+    async def download_files_async(
+        self,
+        canvas_files: List[CanvasFile],
+        download_dir: str,
+        concurrency: int = DOWNLOAD_CONCURRENCY,
+        progress_callback: Optional[Callable[[CanvasFile, Optional[str]], None]] = None,
+        etags: Optional[Dict[str, str]] = None
+    ) -> List[Tuple[CanvasFile, Optional[str]]]:
+        """
+        Download files concurrently, at most `concurrency` at a time.
+
+        Args:
+            canvas_files: Files to download
+            download_dir: Directory to download into (one subdirectory per course)
+            concurrency: Maximum number of downloads in flight
+            progress_callback: Optional callback(canvas_file, local_path) after each download
+            etags: Optional map of file ID to the ETag of the copy on disk, for conditional requests
+
+        Returns:
+            (canvas_file, local_path) pairs in input order; local_path is None on failure
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async with self.open_async_session(concurrency) as session:
+            async def download_one(canvas_file: CanvasFile) -> Tuple[CanvasFile, Optional[str]]:
+                async with semaphore:
+                    local_path = await self.download_file_async(
+                        session,
+                        canvas_file,
+                        download_dir,
+                        etag=etags.get(str(canvas_file.id)) if etags else None
+                    )
+                if progress_callback:
+                    progress_callback(canvas_file, local_path)
+                return canvas_file, local_path
+
+            return await asyncio.gather(*(download_one(f) for f in canvas_files))
+
     # =========================================================================
     # Assignment & Calendar Methods
     # =========================================================================
@@ -2,25 +2,51 @@
 
 import sqlite3
 import json
+import queue
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from contextlib import contextmanager
 from datetime import datetime
 
 
+# Idle connections kept open for reuse (more are opened under heavier concurrency)
+CONNECTION_POOL_SIZE = 8
+
+# Per-connection settings: WAL lets readers run alongside a writer, NORMAL sync is
+# safe under WAL, and mmap serves reads straight from the page cache
+CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA mmap_size = 268435456",
+)
+
+
 class DatabaseService:
     """SQLite database manager for assignment calendar data."""
 
     def __init__(self, db_path: str = "./data/canvas_tracker.db"):
         self.db_path = db_path
         Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._pool: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue(maxsize=CONNECTION_POOL_SIZE)
         self._init_schema()
 
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection usable from any threadpool worker."""
+        # Wait on a locked database instead of failing immediately when writers overlap
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
     @contextmanager
     def get_connection(self):
-        """Get a database connection with context manager."""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        """Get a pooled database connection with context manager."""
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+
         try:
             yield conn
             conn.commit()
@@ -28,11 +54,17 @@ class DatabaseService:
             conn.rollback()
             raise
         finally:
-            conn.close()
+            try:
+                self._pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
 
     def _init_schema(self):
         """Initialize database schema."""
         with self.get_connection() as conn:
+            # Journal mode is stored in the database file, so this only needs to run once
+            conn.execute("PRAGMA journal_mode = WAL")
+
             cursor = conn.cursor()
 
             # Assignments synced from Canvas
@@ -236,15 +268,32 @@ class DatabaseService:
         course_id: Optional[int] = None,
         start_date: Optional[str] = None,
         end_date: Optional[str] = None,
-        limit: int = 100
+        limit: int = 100,
+        after: Optional[Tuple[Optional[str], int]] = None
     ) -> List[Dict[str, Any]]:
-        """Get assignments with optional filters."""
+        """
+        Get assignments with optional filters, ordered by (due_at, id).
+
+        Args:
+            after: (due_at, id) of the last row of the previous page; rows
+                after it are returned (keyset pagination, no OFFSET scan)
+        """
         with self.get_connection() as conn:
             cursor = conn.cursor()
 
             query = "SELECT * FROM assignments WHERE 1=1"
             params = []
 
+            if after:
+                after_due_at, after_id = after
+                # NULL due dates sort first, so a NULL cursor still has every dated row ahead of it
+                if after_due_at is None:
+                    query += " AND (due_at IS NOT NULL OR id > ?)"
+                    params.append(after_id)
+                else:
+                    query += " AND (due_at > ? OR (due_at = ? AND id > ?))"
+                    params.extend([after_due_at, after_due_at, after_id])
+
             if course_id:
                 query += " AND course_id = ?"
                 params.append(course_id)
@@ -257,7 +306,7 @@ class DatabaseService:
                 query += " AND due_at <= ?"
                 params.append(end_date)
 
-            query += " ORDER BY due_at ASC LIMIT ?"
+            query += " ORDER BY due_at ASC, id ASC LIMIT ?"
             params.append(limit)
 
             cursor.execute(query, params)
@@ -312,8 +361,10 @@ class DatabaseService:
         assignment_id: int,
         chunks: List[Dict[str, Any]]
     ):
-        """Save relevant chunks for an assignment."""
+        """Save relevant chunks for an assignment in a single write transaction."""
         with self.get_connection() as conn:
+            # Take the write lock up front so the delete + insert can't hit SQLITE_BUSY halfway
+            conn.execute("BEGIN IMMEDIATE")
             cursor = conn.cursor()
 
             # Clear existing chunks
@@ -323,15 +374,13 @@ class DatabaseService:
             )
 
             # Insert new chunks
-            for chunk in chunks:
-                cursor.execute("""
-                    INSERT INTO assignment_chunks (assignment_id, chunk_id, relevance_score)
-                    VALUES (?, ?, ?)
-                """, (
-                    assignment_id,
-                    chunk["chunk_id"],
-                    chunk.get("relevance_score", 0)
-                ))
+            cursor.executemany("""
+                INSERT INTO assignment_chunks (assignment_id, chunk_id, relevance_score)
+                VALUES (?, ?, ?)
+            """, [
+                (assignment_id, chunk["chunk_id"], chunk.get("relevance_score", 0))
+                for chunk in chunks
+            ])
 
             # Update assignment flag
             cursor.execute(
@@ -2,7 +2,7 @@
 
 import io
 import json
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Mapping, Optional
 from pathlib import Path
 
 from services.markdown_converter import (
@@ -248,6 +248,6 @@ def parse_document(content: bytes, filename: str) -> Dict[str, Any]:
     }
 
 
-def get_supported_formats() -> Dict[str, Any]:
-    """Get comprehensive list of supported file formats."""
+def get_supported_formats() -> Mapping[str, Any]:
+    """Get comprehensive list of supported file formats (read-only)."""
     return get_converter_formats()
@@ -0,0 +1,76 @@
+"""Persistent embedding cache keyed by chunk content hash."""
+
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+
+# Keep each IN (...) query under SQLite's host parameter limit
+_LOOKUP_BATCH_SIZE = 500
+
+
+class EmbeddingCache:
+    """SQLite-backed store of embeddings keyed by (sha256(text), model)."""
+
+    def __init__(self, db_path: str):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS chunk_hash (
+                    hash BLOB NOT NULL,
+                    model TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    PRIMARY KEY (hash, model)
+                )
+            """)
+
+    @staticmethod
+    def hash_text(text: str) -> bytes:
+        """Content hash used as the cache key."""
+        return hashlib.sha256(text.encode("utf-8")).digest()
+
+    def get_many(self, hashes: Sequence[bytes], model: str) -> Dict[bytes, np.ndarray]:
+        """
+        Look up cached embeddings.
+
+        Args:
+            hashes: Content hashes to look up
+            model: Embedding model key (including any dimension override)
+
+        Returns:
+            Dict mapping each cached hash to its float32 vector
+        """
+        found: Dict[bytes, np.ndarray] = {}
+        unique = list(set(hashes))
+
+        with self._lock:
+            for start in range(0, len(unique), _LOOKUP_BATCH_SIZE):
+                batch = unique[start:start + _LOOKUP_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT hash, vector FROM chunk_hash "
+                    f"WHERE model = ? AND hash IN ({placeholders})",
+                    [model, *batch]
+                )
+                for key, vector in rows:
+                    found[key] = np.frombuffer(vector, dtype=np.float32)
+
+        return found
+
+    def put_many(self, hashes: List[bytes], embeddings: Sequence[Sequence[float]], model: str) -> None:
+        """Store embeddings for the given hashes in a single transaction."""
+        rows = [
+            (key, model, np.asarray(vector, dtype=np.float32).tobytes())
+            for key, vector in zip(hashes, embeddings)
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunk_hash (hash, model, vector) VALUES (?, ?, ?)",
+                rows
+            )
@@ -68,10 +68,37 @@ class EmbeddingService:
 
             # Remove prefix if present
             model_id = model_name.replace("sentence-transformers/", "")
-            self._local_models[model_name] = SentenceTransformer(model_id)
+            device = self._select_device()
+            try:
+                # Load from the local cache without contacting the Hugging Face Hub
+                model_obj = SentenceTransformer(model_id, device=device, local_files_only=True)
+            except Exception:
+                # Not cached yet: download it once
+                model_obj = SentenceTransformer(model_id, device=device)
+            if device == "cuda":
+                # Half precision doubles tensor-core throughput with negligible recall loss
+                model_obj.half()
+            self._local_models[model_name] = model_obj
 
         return self._local_models[model_name]
 
+    @staticmethod
+    def _select_device() -> str:
+        """Pick the fastest available torch device for local embeddings."""
+        import torch
+
+        if torch.cuda.is_available():
+            return "cuda"
+        if torch.backends.mps.is_available():
+            return "mps"
+        return "cpu"
+
+    def warmup(self, model: str) -> None:
+        """Load a local model ahead of time so the first embed call is fast."""
+        model_info = EMBEDDING_MODELS.get(model)
+        if model_info and model_info["provider"] == "local":
+            self._get_local_model(model)
+
     def _get_openai_client(self):
         """Get or create OpenAI client."""
         if self._openai_client is None:
@@ -115,6 +142,9 @@ class EmbeddingService:
             if not self.openai_api_key:
                 raise ValueError("OpenAI API key required. Set OPENAI_API_KEY in your .env file.")
             embeddings = self._embed_openai(texts, model, dimensions, batch_size)
+            if normalize:
+                # Inner-product collections rank like cosine only for unit-length vectors
+                embeddings = self._normalize(embeddings)
         else:
             raise ValueError(f"Unknown provider: {model_info['provider']}")
 
@@ -146,7 +176,15 @@ class EmbeddingService:
             show_progress_bar=len(texts) > 10
         )
 
-        return embeddings.tolist()
+        # fp16 models return float16 arrays; hand back full-precision floats
+        return np.asarray(embeddings, dtype=np.float32).tolist()
+
+    @staticmethod
+    def _normalize(embeddings: List[List[float]]) -> List[List[float]]:
+        """Scale each vector to unit length."""
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+        return vectors.tolist()
 
     def _embed_openai(
         self,
@@ -22,6 +22,7 @@ class TrackedFile:
     collection_name: str
     chunk_count: int
     file_size: int
+    etag: Optional[str] = None
 
 
 class FileTracker:
@@ -48,10 +49,16 @@ class FileTracker:
                 processed_at TEXT NOT NULL,
                 collection_name TEXT NOT NULL,
                 chunk_count INTEGER DEFAULT 0,
-                file_size INTEGER DEFAULT 0
+                file_size INTEGER DEFAULT 0,
+                etag TEXT
             )
         """)
 
+        # Databases created before ETag tracking lack the column
+        columns = {row[1] for row in cursor.execute("PRAGMA table_info(processed_files)")}
+        if "etag" not in columns:
+            cursor.execute("ALTER TABLE processed_files ADD COLUMN etag TEXT")
+
         cursor.execute("""
             CREATE INDEX IF NOT EXISTS idx_course_id ON processed_files(course_id)
         """)
@@ -100,12 +107,57 @@ class FileTracker:
         if not row:
             return False
 
+        return self.is_current(row[0], canvas_modified_at)
+
+    @staticmethod
+    def is_current(stored_modified_at: Optional[str], canvas_modified_at: Optional[str]) -> bool:
+        """Check whether a processed file's stored modification time is up to date."""
         # If we have modification times, check if file was updated
-        if canvas_modified_at and row[0]:
-            return row[0] >= canvas_modified_at
+        if canvas_modified_at and stored_modified_at:
+            return stored_modified_at >= canvas_modified_at
 
         return True
 
+    def get_processed_map(self, collection_name: str) -> Dict[str, Optional[str]]:
+        """
+        Get every processed file in a collection with a single query.
+
+        Returns:
+            Dict mapping file_id to its stored canvas_modified_at
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            SELECT file_id, canvas_modified_at FROM processed_files
+            WHERE collection_name = ?
+        """, (collection_name,))
+
+        processed = dict(cursor.fetchall())
+        conn.close()
+
+        return processed
+
+    def get_etags(self, collection_name: str) -> Dict[str, str]:
+        """
+        Get the HTTP ETag recorded for each processed file in a collection.
+
+        Returns:
+            Dict mapping file_id to its ETag (files without one are omitted)
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            SELECT file_id, etag FROM processed_files
+            WHERE collection_name = ? AND etag IS NOT NULL
+        """, (collection_name,))
+
+        etags = dict(cursor.fetchall())
+        conn.close()
+
+        return etags
+
     def mark_processed(
         self,
         file_id: str,
@@ -117,7 +169,8 @@ class FileTracker:
         chunk_count: int = 0,
         file_size: int = 0,
         file_hash: Optional[str] = None,
-        canvas_modified_at: Optional[str] = None
+        canvas_modified_at: Optional[str] = None,
+        etag: Optional[str] = None
     ):
         """Mark a file as processed."""
         conn = sqlite3.connect(self.db_path)
@@ -126,8 +179,8 @@ class FileTracker:
         cursor.execute("""
             INSERT OR REPLACE INTO processed_files
             (file_id, filename, course_id, course_name, source, file_hash,
-             canvas_modified_at, processed_at, collection_name, chunk_count, file_size)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+             canvas_modified_at, processed_at, collection_name, chunk_count, file_size, etag)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """, (
             str(file_id),
             filename,
@@ -139,7 +192,32 @@ class FileTracker:
             datetime.utcnow().isoformat(),
             collection_name,
             chunk_count,
-            file_size
+            file_size,
+            etag
+        ))
+
+        conn.commit()
+        conn.close()
+
+    def mark_current(
+        self,
+        file_id: str,
+        collection_name: str,
+        canvas_modified_at: Optional[str] = None
+    ):
+        """Record that a processed file's content is unchanged as of canvas_modified_at."""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            UPDATE processed_files
+            SET canvas_modified_at = ?, processed_at = ?
+            WHERE file_id = ? AND collection_name = ?
+        """, (
+            canvas_modified_at,
+            datetime.utcnow().isoformat(),
+            str(file_id),
+            collection_name
         ))
 
         conn.commit()
@@ -181,7 +259,8 @@ class FileTracker:
                 processed_at=row[7],
                 collection_name=row[8],
                 chunk_count=row[9],
-                file_size=row[10]
+                file_size=row[10],
+                etag=row[11]
             )
             for row in rows
         ]
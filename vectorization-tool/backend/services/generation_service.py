@@ -1,7 +1,7 @@
 """Generation service for LLM-powered study guides and solutions."""
 
 import re
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional
 from dataclasses import dataclass
 from openai import OpenAI
 
@@ -117,22 +117,59 @@ Format your response in markdown with clear sections."""
 
         return citations
 
-    # =========================================================================
-    # Study Guide Generation
-    # =========================================================================
-
-    def generate_study_guide(
+    def _stream_completion(
         self,
         assignment_id: int,
-        model: Optional[str] = None,
-        max_context_tokens: int = 8000,
-        save_to_db: bool = True
-    ) -> GenerationResult:
+        content_type: str,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float,
+        save_to_db: bool
+    ) -> Iterator[Dict[str, Any]]:
         """
-        Generate a study guide for an assignment based on relevant course materials.
+        Stream a chat completion as {"delta": text} events.
+
+        Once the model finishes, the full markdown is saved like the
+        non-streaming path and a final {"done": True, ...} event carries
+        the citations.
         """
-        model = model or self.default_model
+        stream = self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=4000,
+            stream=True
+        )
+
+        parts = []
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                parts.append(delta)
+                yield {"delta": delta}
+
+        content = "".join(parts)
+        citations = self._extract_citations(content)
+
+        if save_to_db:
+            self.db.save_generated_content(
+                assignment_id=assignment_id,
+                content_type=content_type,
+                content_markdown=content,
+                citations=[c["filename"] for c in citations],
+                model_used=model
+            )
+
+        yield {"done": True, "citations": citations, "model_used": model}
+
+    # =========================================================================
+    # Study Guide Generation
+    # =========================================================================
 
+    def _study_guide_messages(self, assignment_id: int, max_context_tokens: int) -> List[Dict[str, str]]:
+        """Build the chat messages for a study guide (retrieval + Canvas file fetch)."""
         # Get assignment
         assignment = self.db.get_assignment(assignment_id)
         if not assignment:
@@ -183,13 +220,28 @@ Create a study guide that:
 3. Provides practice problems or review questions
 4. Cites specific sources using [Source: filename] format"""
 
+        return [
+            {"role": "system", "content": self.STUDY_GUIDE_SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt}
+        ]
+
+    def generate_study_guide(
+        self,
+        assignment_id: int,
+        model: Optional[str] = None,
+        max_context_tokens: int = 8000,
+        save_to_db: bool = True
+    ) -> GenerationResult:
+        """
+        Generate a study guide for an assignment based on relevant course materials.
+        """
+        model = model or self.default_model
+        messages = self._study_guide_messages(assignment_id, max_context_tokens)
+
         # Call LLM
         response = self.client.chat.completions.create(
             model=model,
-            messages=[
-                {"role": "system", "content": self.STUDY_GUIDE_SYSTEM_PROMPT},
-                {"role": "user", "content": user_prompt}
-            ],
+            messages=messages,
             temperature=0.7,
             max_tokens=4000
         )
@@ -220,29 +272,36 @@ Create a study guide that:
 
         return result
 
-    def get_study_guide(self, assignment_id: int) -> Optional[Dict[str, Any]]:
-        """Get cached study guide for an assignment."""
-        return self.db.get_generated_content(assignment_id, "study_guide")
-
-    # =========================================================================
-    # Solution Generation (Nuclear Option)
-    # =========================================================================
-
-    def generate_solution(
+    def generate_study_guide_stream(
         self,
         assignment_id: int,
         model: Optional[str] = None,
         max_context_tokens: int = 8000,
         save_to_db: bool = True
-    ) -> GenerationResult:
+    ) -> Iterator[Dict[str, Any]]:
         """
-        Generate a solution attempt for an assignment.
+        Generate a study guide, yielding the markdown as it is produced.
 
-        WARNING: This is the "nuclear option" - provides complete solutions.
-        Use responsibly and in accordance with academic integrity policies.
+        Retrieval and prompt building happen before this returns, so a missing
+        assignment raises ValueError here rather than mid-stream.
         """
         model = model or self.default_model
+        messages = self._study_guide_messages(assignment_id, max_context_tokens)
+        return self._stream_completion(
+            assignment_id, "study_guide", messages, model,
+            temperature=0.7, save_to_db=save_to_db
+        )
 
+    def get_study_guide(self, assignment_id: int) -> Optional[Dict[str, Any]]:
+        """Get cached study guide for an assignment."""
+        return self.db.get_generated_content(assignment_id, "study_guide")
+
+    # =========================================================================
+    # Solution Generation (Nuclear Option)
+    # =========================================================================
+
+    def _solution_messages(self, assignment_id: int, max_context_tokens: int) -> List[Dict[str, str]]:
+        """Build the chat messages for a solution attempt (retrieval + Canvas file fetch)."""
         # Get assignment
         assignment = self.db.get_assignment(assignment_id)
         if not assignment:
@@ -297,13 +356,31 @@ Provide:
 4. The final answer clearly marked
 5. Any relevant formulas or concepts used"""
 
+        return [
+            {"role": "system", "content": self.SOLUTION_SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt}
+        ]
+
+    def generate_solution(
+        self,
+        assignment_id: int,
+        model: Optional[str] = None,
+        max_context_tokens: int = 8000,
+        save_to_db: bool = True
+    ) -> GenerationResult:
+        """
+        Generate a solution attempt for an assignment.
+
+        WARNING: This is the "nuclear option" - provides complete solutions.
+        Use responsibly and in accordance with academic integrity policies.
+        """
+        model = model or self.default_model
+        messages = self._solution_messages(assignment_id, max_context_tokens)
+
         # Call LLM
         response = self.client.chat.completions.create(
             model=model,
-            messages=[
-                {"role": "system", "content": self.SOLUTION_SYSTEM_PROMPT},
-                {"role": "user", "content": user_prompt}
-            ],
+            messages=messages,
             temperature=0.3,  # Lower temperature for more deterministic solutions
             max_tokens=4000
         )
@@ -334,6 +411,21 @@ Provide:
 
         return result
 
+    def generate_solution_stream(
+        self,
+        assignment_id: int,
+        model: Optional[str] = None,
+        max_context_tokens: int = 8000,
+        save_to_db: bool = True
+    ) -> Iterator[Dict[str, Any]]:
+        """Streaming variant of generate_solution (see generate_study_guide_stream)."""
+        model = model or self.default_model
+        messages = self._solution_messages(assignment_id, max_context_tokens)
+        return self._stream_completion(
+            assignment_id, "solution", messages, model,
+            temperature=0.3, save_to_db=save_to_db
+        )
+
     def get_solution(self, assignment_id: int) -> Optional[Dict[str, Any]]:
         """Get cached solution for an assignment."""
         return self.db.get_generated_content(assignment_id, "solution")
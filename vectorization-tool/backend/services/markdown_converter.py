@@ -1,8 +1,10 @@
 """Markdown converter for various file types."""
 
 import re
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Any, Optional, Tuple
+from types import MappingProxyType
+from typing import Dict, Any, Mapping, Optional, Tuple
 
 # Files that can be parsed directly (no conversion needed)
 NATIVE_FORMATS = {
@@ -444,10 +446,15 @@ def _convert_html(content: str, filename: str) -> Dict[str, Any]:
     }
 
 
-def get_supported_formats() -> Dict[str, Any]:
-    """Get information about all supported formats."""
-    return {
-        "native": {ext: desc for ext, desc in NATIVE_FORMATS.items()},
-        "convertible": {ext: info[1] for ext, info in CONVERTIBLE_FORMATS.items()},
-        "all_extensions": sorted(ALL_SUPPORTED)
-    }
+@lru_cache(maxsize=1)
+def get_supported_formats() -> Mapping[str, Any]:
+    """
+    Get information about all supported formats.
+
+    Built once and shared between callers, so the result is read-only.
+    """
+    return MappingProxyType({
+        "native": MappingProxyType(dict(NATIVE_FORMATS)),
+        "convertible": MappingProxyType({ext: info[1] for ext, info in CONVERTIBLE_FORMATS.items()}),
+        "all_extensions": tuple(sorted(ALL_SUPPORTED))
+    })